@@ -0,0 +1,39 @@
+# Synthetic workload tool for the engine benchmark
+# Each task item is (seconds, message size): the task sleeps for the given
+# time and then sends a result record with a message of the given size
+
+# Modules for synthetic workload
+import time
+
+# Define preproces variable
+def pre_ProcessVariable():
+    return False
+
+# Define preprocess keys
+def resultsKey():
+    return 'Task | Seconds | Payload'
+
+# Define preprocess keys
+def errorsKey():
+    return 'Task | Error Message'
+
+# Synthetic Fix Function
+def syntheticFix(variableList, destinationFolder, preProcessVariable, logOnly, queue):
+    for seconds, messageSize in variableList:
+        # Simulated processing time
+        if seconds > 0:
+            time.sleep(seconds)
+
+        # Simulated result
+        queue.result('synthetic-' + str(queue.taskId), (seconds,),
+                     'x' * messageSize)
+
+# Synthetic Fix Batch Function
+# Same workload sent as one block message per block of tasks
+def syntheticFixBatch(variableList, destinationFolder, preProcessVariable, logOnly, queue):
+    seconds = sum([x[0] for x in variableList])
+    if seconds > 0:
+        time.sleep(seconds)
+    queue.resultBlock(['synthetic-' + str(x) for x in queue.taskIds],
+                      [(x[0],) for x in variableList],
+                      ['x' * x[1] for x in variableList])
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+# Measures result messages per second from worker processes to the menu
+# process through the old Manager proxy queue and through the result channel
+# Usage: python channelBenchmark.py [producers] [messagesPerProducer]
+
+# Modules for channel benchmark
+import multiprocessing, os, sys, time
+
+# Append menu folder to system path for access to the menu modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+import resultChannel, resultRecord
+
+# Function: Packed record of the size the test tools send
+def _sampleRecord(taskId):
+    return resultRecord.ResultRecord(1, taskId, resultRecord.RESULT,
+                                     'randTask-' + str(taskId),
+                                     (12.345, 67.891, 23.456),
+                                     'This was a random task that multi menu'
+                                     ' is processing.').pack()
+
+# Function: Producer writing straight to the Manager proxy queue
+def _managerProducer(queue, messageCount):
+    for taskId in xrange(messageCount):
+        queue.put(_sampleRecord(taskId))
+
+# Function: Producer writing through the batched channel writer
+def _channelProducer(channel, messageCount):
+    writer = channel.writer()
+    for taskId in xrange(messageCount):
+        writer.put(_sampleRecord(taskId))
+    writer.flush()
+
+# Function: Consumer loop of the old _updateGUI (empty()/get() per message)
+def _managerConsumer(queue, totalCount):
+    received = 0
+    while received < totalCount:
+        while queue.empty() == False:
+            queue.get()
+            received += 1
+
+# Function: Consumer loop draining whole batches
+def _channelConsumer(channel, totalCount):
+    received = 0
+    while received < totalCount:
+        received += len(channel.drain())
+
+# Function: Time producers and consumer and return messages per second
+def _measure(producer, consumer, transport, producerCount, messageCount):
+    processes = [multiprocessing.Process(target = producer,
+                                         args = (transport, messageCount))
+                 for x in range(producerCount)]
+    started = time.time()
+    for process in processes:
+        process.start()
+    consumer(transport, producerCount * messageCount)
+    elapsed = time.time() - started
+    for process in processes:
+        process.join()
+    return producerCount * messageCount / elapsed
+
+# Run benchmark
+if __name__ == '__main__':
+    producerCount = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    messageCount = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    manager = multiprocessing.Manager()
+    managerRate = _measure(_managerProducer, _managerConsumer,
+                           manager.Queue(), producerCount, messageCount)
+    manager.shutdown()
+    channelRate = _measure(_channelProducer, _channelConsumer,
+                           resultChannel.ResultChannel(), producerCount,
+                           messageCount)
+
+    print 'producers: %d, messages: %d' % (producerCount,
+                                           producerCount * messageCount)
+    print 'manager queue:  %12.0f messages/s' % managerRate
+    print 'result channel: %12.0f messages/s' % channelRate
+    print 'speedup:        %12.1fx' % (channelRate / managerRate)
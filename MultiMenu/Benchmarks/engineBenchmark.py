@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+# Drives the task engine with seeded synthetic workloads and reports wall
+# time, result messages per second, GUI tick latency and peak memory per
+# scenario as JSON lines (one line per scenario, sorted keys) so results of
+# two commits can be diffed or compared with --compare
+# Usage: python engineBenchmark.py [--scenario NAME] [--seed N]
+#                                  [--workers N] [--output FILE]
+#        python engineBenchmark.py --compare OLD.jsonl NEW.jsonl
+
+# Modules for engine benchmark
+import argparse, json, multiprocessing, os, platform, random, shutil, sys,\
+       tempfile, threading, time
+
+# Append menu folder to system path for access to the menu modules
+benchmarkFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(benchmarkFolder, os.pardir))
+import taskEngine, taskMetrics
+
+# Synthetic workload tool folder
+syntheticToolsFolder = os.path.join(benchmarkFolder, 'Tools')
+
+# Time budget of one _updateGUI tick
+tickBudget = 0.04
+
+# Scenarios: task count, mean task seconds, mean message size in bytes and
+# worker count (None uses every cpu). Like the real tools every task sends
+# one result message; batch scenarios send one block message per block of
+# tasks through the tool's batch function.
+scenarios = [
+    {'name': 'dispatch-overhead', 'tasks': 5000, 'seconds': 0.0,
+     'messageSize': 16, 'workers': None},
+    {'name': 'message-flood', 'tasks': 50000, 'seconds': 0.0,
+     'messageSize': 64, 'workers': None},
+    {'name': 'message-flood-batch', 'tasks': 50000, 'seconds': 0.0,
+     'messageSize': 64, 'workers': None, 'batch': True},
+    {'name': 'large-messages', 'tasks': 5000, 'seconds': 0.0,
+     'messageSize': 16384, 'workers': None},
+    {'name': 'short-tasks', 'tasks': 400, 'seconds': 0.005,
+     'messageSize': 64, 'workers': None},
+    {'name': 'single-worker', 'tasks': 5000, 'seconds': 0.0,
+     'messageSize': 64, 'workers': 1}]
+
+# Function: Seeded task items (seconds, message size)
+# Task times and message sizes are exponentially distributed around the
+# scenario's means
+def syntheticTasks(scenario, seed):
+    generator = random.Random(seed)
+    tasks = []
+    for x in xrange(scenario['tasks']):
+        if scenario['seconds'] > 0:
+            seconds = generator.expovariate(1.0 / scenario['seconds'])
+        else:
+            seconds = 0.0
+        messageSize = int(generator.expovariate(1.0 / scenario['messageSize']))
+        tasks.append((seconds, messageSize))
+    return tasks
+
+# Function: Peak resident memory in kilobytes of the given processes
+# Uses VmHWM from /proc where available, otherwise this process' ru_maxrss
+def peakRss(pids):
+    peak = 0
+    for pid in pids:
+        try:
+            with open('/proc/%d/status' % pid) as statusFile:
+                for line in statusFile:
+                    if line.startswith('VmHWM:'):
+                        peak += int(line.split()[1])
+        except IOError:
+            pass
+    if peak == 0:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+    return peak
+
+# Function: Run one scenario on a fresh engine and return its measurements
+def runScenario(scenario, seed, workerCount, logsFolder):
+    workerCount = scenario['workers'] or workerCount
+    tasks = syntheticTasks(scenario, seed)
+    engine = taskEngine.TaskEngine(workerCount,
+                                   logsFolder,
+                                   keepResults = True,
+                                   toolFolders = [taskEngine.toolsFolder,
+                                                  syntheticToolsFolder])
+    try:
+        # Let the workers start before the clock runs
+        time.sleep(0.5)
+
+        # Collect results the way _updateGUI does: one budgeted poll per
+        # tick, ticking again after 10 ms while results are waiting, every
+        # 250 ms while the engine needs polling and otherwise when the
+        # engine's reader thread reports results
+        resultsReady = threading.Event()
+        engine.notifyOnResults(resultsReady.set)
+        tickSeconds = []
+        started = time.time()
+        run = engine.startRun('syntheticFix', tasks, '', '', 1, 'NO',
+                              batch = scenario.get('batch', False))
+        while True:
+            tickStarted = time.time()
+            resultsReady.clear()
+            updatedRuns, resultsBacklog = engine.poll(tickBudget)
+            tickSeconds.append(time.time() - tickStarted)
+            if run.status != 'running':
+                break
+            elif resultsBacklog:
+                time.sleep(0.01)
+            elif engine.needsPolling():
+                resultsReady.wait(0.25)
+            else:
+                resultsReady.wait()
+        wallSeconds = time.time() - started
+
+        # Measure memory before the workers exit
+        pids = [os.getpid()] + [worker.pid for worker in engine.workerPool.workers]
+        peakKilobytes = peakRss(pids)
+    finally:
+        engine.shutdown()
+
+    tickSeconds.sort()
+    messageCount = run.progressCount + run.errorCount
+    return {'scenario': scenario['name'],
+            'seed': seed,
+            'workers': workerCount,
+            'tasks': len(tasks),
+            'messages': messageCount,
+            'wallSeconds': round(wallSeconds, 4),
+            'messagesPerSecond': round(messageCount / wallSeconds, 1),
+            'tasksPerSecond': round(len(tasks) / wallSeconds, 1),
+            'ticks': len(tickSeconds),
+            'tickP50Ms': round(1000 * taskMetrics.percentile(tickSeconds, 0.50), 3),
+            'tickP99Ms': round(1000 * taskMetrics.percentile(tickSeconds, 0.99), 3),
+            'tickMaxMs': round(1000 * tickSeconds[-1], 3) if tickSeconds else 0.0,
+            'peakRssKb': peakKilobytes}
+
+# Function: Run one scenario in a child process so the peak memory of one
+# scenario does not carry over into the next
+def runIsolated(scenario, seed, workerCount, logsFolder):
+    resultQueue = multiprocessing.Queue()
+    process = multiprocessing.Process(target = _isolatedScenario,
+                                      args = (resultQueue, scenario, seed,
+                                              workerCount, logsFolder))
+    process.start()
+    result = resultQueue.get()
+    process.join()
+    return result
+
+# Function: Child process body of runIsolated
+def _isolatedScenario(resultQueue, scenario, seed, workerCount, logsFolder):
+    resultQueue.put(runScenario(scenario, seed, workerCount, logsFolder))
+
+# Function: Print per-scenario changes between two result files
+def compare(oldPath, newPath):
+    # Function: Scenario lines of a result file by scenario name
+    def load(path):
+        with open(path) as resultFile:
+            lines = [json.loads(line) for line in resultFile if line.strip()]
+        return dict((line['scenario'], line) for line in lines
+                    if 'scenario' in line)
+
+    oldResults, newResults = load(oldPath), load(newPath)
+    for name in sorted(set(oldResults) & set(newResults)):
+        print name
+        for key in ('wallSeconds', 'messagesPerSecond', 'tickP99Ms', 'peakRssKb'):
+            oldValue, newValue = oldResults[name][key], newResults[name][key]
+            change = (newValue - oldValue) * 100.0 / oldValue if oldValue else 0.0
+            print '  %-18s %12s -> %12s  %+7.1f%%' % (key, oldValue, newValue,
+                                                      change)
+
+# Run benchmark
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark the task '
+                                     'engine with synthetic workloads.')
+    parser.add_argument('--scenario', action = 'append',
+                        choices = [x['name'] for x in scenarios],
+                        help = 'scenario to run (default: all)')
+    parser.add_argument('--seed', type = int, default = 1,
+                        help = 'workload random seed')
+    parser.add_argument('--workers', type = int,
+                        default = multiprocessing.cpu_count(),
+                        help = 'worker count of scenarios without their own')
+    parser.add_argument('--output', help = 'also write the results here')
+    parser.add_argument('--compare', nargs = 2, metavar = ('OLD', 'NEW'),
+                        help = 'compare two result files instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    # Header line describing the machine, then one line per scenario
+    lines = [{'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpus': multiprocessing.cpu_count()}]
+    print json.dumps(lines[0], sort_keys = True)
+    logsFolder = tempfile.mkdtemp(prefix = 'engineBenchmark')
+    try:
+        for scenario in scenarios:
+            if args.scenario and scenario['name'] not in args.scenario:
+                continue
+            lines.append(runIsolated(scenario, args.seed, args.workers,
+                                     logsFolder))
+            print json.dumps(lines[-1], sort_keys = True)
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(logsFolder)
+
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            for line in lines:
+                outputFile.write(json.dumps(line, sort_keys = True) + '\n')
@@ -1,12 +1,39 @@
 # -*- coding: utf-8 -*-
 
 # Modules for main menu
-import ctypes, functools, multiprocessing, numpy, os, re, sys, time, Tkinter,\
-       tkFileDialog, ttk
+import ctypes, functools, multiprocessing, renderScheduler, resultStore,\
+       shutil, sys, taskEngine, time, Tkinter, tkFileDialog, ttk, virtualList
 
-# Append python file path to system path for access to tools folder
-toolsFolder = os.path.join(os.path.dirname(sys.argv[0]), "Tools")
-sys.path.append(toolsFolder)
+################################################################################
+# Class object: A tab's run and the widgets showing it
+class RunState(object):
+    __slots__ = ('processName', 'run', 'widgetList', 'resultsView',
+                 'errorsView', 'displayTextVar1', 'displayTextVar2',
+                 'progressValueVar', 'progressBar', 'dashboardTextVar',
+                 'columnStatsListBox', 'killButton', 'resetButton',
+                 'logButton')
+
+    # Initializer
+    def __init__(self, processName, resultsView, errorsView, displayTextVar1,
+                 displayTextVar2, progressValueVar, progressBar,
+                 dashboardTextVar, columnStatsListBox, killButton, resetButton,
+                 logButton):
+        self.processName = processName
+        self.resultsView = resultsView
+        self.errorsView = errorsView
+        self.displayTextVar1 = displayTextVar1
+        self.displayTextVar2 = displayTextVar2
+        self.progressValueVar = progressValueVar
+        self.progressBar = progressBar
+        self.dashboardTextVar = dashboardTextVar
+        self.columnStatsListBox = columnStatsListBox
+        self.killButton = killButton
+        self.resetButton = resetButton
+        self.logButton = logButton
+
+        # Engine run started from the tab and the widgets it disabled
+        self.run = None
+        self.widgetList = []
 
 ################################################################################
 # Class object
@@ -18,37 +45,54 @@ class MultiMenu:
         
         # CPU resource variables
         self.cpuThreadCount = multiprocessing.cpu_count()
-        self.cpuTrackers = []
-        self.cpuEntries = []
         self.CPUEntryVar = None
         self.CPUMainEntry = None
 
-        # Image types allowed
-        self.allowedImageFormats = ['kap','jp2','jpg','tif','iff']
-
-        # Create the manager queue instance
-        self.manager = multiprocessing.Manager()
-        self.resultsQueue = self.manager.Queue()
-
-        # Tools found in tool folder
-        self.toolsFoundRaw = [re.search(r'(.*?)\.', x).group(1) \
-                           for x in os.listdir(toolsFolder)\
-                           if x.endswith('.py')]
-        self.toolsFoundFiltered = [re.search(r'[\d]*([\w\d-]*)', x).group(1)\
-                                   for x in os.listdir(toolsFolder)\
-                                   if x.endswith('.py')]
-        self.toolsDictionary = dict(zip(self.toolsFoundFiltered,
-                                        self.toolsFoundRaw))
-        
-        # List of killed tasks
+        # Start the task engine and its warm worker pool shared by all tabs
+        self.engine = taskEngine.TaskEngine(self.cpuThreadCount)
+
+        # Seconds of each GUI tick spent draining results
+        self.updateTimeBudget = 0.04
+
+        # Milliseconds between the arrival of results and the GUI update
+        # showing them: none while results trickle in, growing up to
+        # maxCoalesceDelay while they arrive faster than the GUI redraws
+        self.coalesceDelay = 0
+        self.maxCoalesceDelay = 50
+
+        # Milliseconds between GUI updates while a run changes without
+        # results arriving (preprocessing, discovery, kills)
+        self.statusInterval = 250
+
+        # Scheduled GUI update (after id and due time) and start of the last
+        self.updateAfterId = None
+        self.updateDue = 0.0
+        self.lastUpdate = 0.0
+
+        # Notebook tab frames and the run state of each tab by tool name
+        self.tabFrames = []
+        self.runStates = {}
+
+        # Run states of the killed tasks
         self.killedTasks = []
 
-        # List of completed tasks
+        # Run states of the completed tasks
         self.completedTasks = []
 
         # Tkinter root instance
         self.root = Tkinter.Tk()
 
+        # Widget redraws, coalesced to at most 30 frames per second
+        self.renderScheduler = renderScheduler.RenderScheduler(self.root, 30)
+
+        # Wake the GUI update routine when results arrive; Tcl built without
+        # threads cannot be called from the engine's reader thread, so the
+        # routine polls every 100 milliseconds there
+        self.resultsEvents = self.root.tk.eval('info exists tcl_platform(threaded)') == '1'
+        if self.resultsEvents:
+            self.root.bind('<<ResultsReady>>', self._resultsReady)
+            self.engine.notifyOnResults(self._notifyResults)
+
         # Initiate GUI update routine
         self._updateGUI()
 
@@ -106,12 +150,12 @@ class MultiMenu:
         toolsListBox.grid(column = 0, columnspan = 2, row = 1,
                           sticky = (Tkinter.W, Tkinter.E))
 
-        # Insert tools found in tools list box
-        self.toolsFoundRaw.sort() # sort the tools list
-        for tool in self.toolsFoundRaw:
-            toolsListBox.insert('end',
-                                re.search(r'[\d]*([\w\d-]*)',
-                                          tool).group(1))
+        # Insert tools found in tools list box in tool folder order, picking
+        # up tools added or edited since the menu started
+        self.engine.refreshTools()
+        toolsDictionary = self.engine.toolsDictionary
+        for tool in sorted(toolsDictionary, key = toolsDictionary.get):
+            toolsListBox.insert('end', tool)
 
         # Tool vertical scroll bar
         toolsVertScrollBar = Tkinter.Scrollbar(topLevel,
@@ -133,7 +177,6 @@ class MultiMenu:
 
         # Toplevel functions
         def chooseTools():
-            tabCount = 1
             toolSelection = toolsListBox.curselection()
             if len(toolSelection) != 0:
                 for item in toolsListBox.curselection():
@@ -141,18 +184,14 @@ class MultiMenu:
                     toolName = toolsListBox.get(item)
 
                     # Set notebook tab name
-                    setattr(self, 'tab' + str(tabCount),
-                            Tkinter.Frame(notebook, name = toolName))
+                    tabFrame = Tkinter.Frame(notebook, name = toolName)
+                    self.tabFrames.append(tabFrame)
 
                     # Add notebook tab to 
-                    notebook.add(getattr(self, 'tab' + str(tabCount)),
-                                 text = toolName)
+                    notebook.add(tabFrame, text = toolName)
 
                     # Build tab menu
-                    self._buildMenu(getattr(self, 'tab' + str(tabCount)))
-
-                    # Increment tab count by 1
-                    tabCount += 1
+                    self._buildMenu(tabFrame)
 
             # Quit top level menu
             topLevel.destroy()
@@ -182,192 +221,219 @@ class MultiMenu:
 
     # Class Function: Update CPU Resources
     def _updateCPUResources(self):
-        # Add up all currently selected cpu resources per tool
-        # User should keep selected cpu resource count for each tool
-        # at zero if they are not using it
-        cpus = 0
-        for cpu in self.cpuTrackers:
-            cpus += int(cpu.get())
-
-        # Control cpu comboboxes
-        if cpus >= self.cpuThreadCount:
-            for cpuCombo in self.cpuEntries:
-                cpuCombo.config(values = [0])
-        else:
-            for cpuCombo in self.cpuEntries:
-                cpuCombo.config(values = range(((self.cpuThreadCount - cpus) + 1)))
-
-        # Update CPU resources label and combbox entries
+        # Every cpu is shared by the active runs in proportion to their
+        # tabs' cpu share, so show how the busy cpus are currently split
         if self.CPUEntryVar != None or self.CPUMainEntry != None:
-            cpuUpdateString = 'Number of CPUs available for tasking: [' \
-                              + str(self.cpuThreadCount - cpus) + ']'
+            workerShares = self.engine.workerShares()
+            cpuUpdateString = 'CPUs busy: [' \
+                              + str(sum([x[1] for x in workerShares])) + '/' \
+                              + str(self.cpuThreadCount) + ']' \
+                              + ''.join([' ' + run.toolName + ': ' + str(running)
+                                         for run, running in workerShares])
             self.CPUEntryVar.set(cpuUpdateString)
-            self.CPUMainEntry.update()            
     
+    # Class Function: Post a results event to the Tk loop (called from the
+    # engine's reader thread)
+    def _notifyResults(self):
+        try:
+            self.root.event_generate('<<ResultsReady>>', when = 'tail')
+        except (RuntimeError, Tkinter.TclError):
+            # The main window is closed
+            pass
+
+    # Class Function: Show newly arrived results after the coalescing delay
+    def _resultsReady(self, event):
+        self._scheduleUpdate(self.coalesceDelay)
+
+    # Class Function: Run the GUI update routine in delay milliseconds, unless
+    # it is already scheduled to run sooner
+    def _scheduleUpdate(self, delay):
+        due = time.time() + delay / 1000.0
+        if self.updateAfterId != None:
+            if self.updateDue <= due:
+                return
+            self.root.after_cancel(self.updateAfterId)
+        self.updateDue = due
+        self.updateAfterId = self.root.after(delay, self._updateGUI)
+
     # Function: Update the GUI with processing errors and results
     # http://code.activestate.com/recipes/82965-threads-tkinter-and-asynchronous-io/
     def _updateGUI(self):
-        # Update CPU Resources
-        self._updateCPUResources()
-        
-        # Function: Check completed tasks list
-        def checkCompletedTasks(processName = None):
-            # Closing procedures for completed tasks
-            if len(self.completedTasks) > 0 or processName != None:
-                for processName in self.completedTasks:
-                    # Set display message 2 to complete
-                    getattr(self, processName + 'Display')[2].set('100% Complete')
-                    getattr(self, processName + 'Display')[3].update()
-
-                    # Update progress bar to complete
-                    getattr(self, processName + 'Progress')[0].set(100)
-                    getattr(self, processName + 'Progress')[1].update()                 
-
-                    # Terminate processes (cleanup processing)
-                    for process in getattr(self, processName + 'ProcessList'):
-                        getattr(self, processName + 'Display')[0].set(('Cleaning up ' + str(process.name)))
-                        getattr(self, processName + 'Display')[1].update()
-                        print str(process.name)
-                        process.join(1)
-
-                    # Enable process menu if finished
-                    self._enableActionableWidgets(getattr(self, processName + 'WidgetList'))
-
-                    # Display message that analyst ended process
-                    getattr(self, processName + 'Display')[0].set((processName + ' completed.'))
-                    getattr(self, processName + 'Display')[1].update()
+        self.updateAfterId = None
+
+        # Wait longer before showing results while updates follow each other
+        # closely (a burst), and less once results come in slowly again
+        updateStarted = time.time()
+        if updateStarted - self.lastUpdate < 2 * self.maxCoalesceDelay / 1000.0:
+            self.coalesceDelay = min(self.maxCoalesceDelay,
+                                     max(5, 2 * self.coalesceDelay))
+        else:
+            self.coalesceDelay //= 2
+        self.lastUpdate = updateStarted
 
-                    # Enable reset button
-                    getattr(self, (processName + "ResetButton")).config(state = Tkinter.NORMAL)
-                    getattr(self, (processName + "ResetButton")).update()
+        # Function: Check completed tasks list
+        def checkCompletedTasks():
+            # Closing procedures for completed tasks (the tab shows the
+            # completion when it is rendered)
+            while self.completedTasks:
+                runState = self.completedTasks.pop(0)
 
-                    # Enable log button
-                    getattr(self, (processName + "LogButton")).config(state = Tkinter.NORMAL)
-                    getattr(self, (processName + "LogButton")).update()
+                # Enable process menu if finished
+                self._enableActionableWidgets(runState.widgetList)
 
-                    # Set ending time for process
-                    setattr(self, (processName + "TimeEnded"), time.ctime())           
+                # Enable reset button
+                runState.resetButton.config(state = Tkinter.NORMAL)
 
-                    # Remove process name from completed list
-                    self.completedTasks.remove(processName)
+                # Enable log button once the run's profile report is merged
+                runState.logButton.config(state = Tkinter.NORMAL if runState.run.retired
+                                          else Tkinter.DISABLED)
 
-                    # Disable Kill Button
-                    getattr(self, (processName + 'KillButton')).config(state = Tkinter.DISABLED)
+                # Disable Kill Button
+                runState.killButton.config(state = Tkinter.DISABLED)
 
         # Function: Check killed tasks list
-        def checkKilledTasks(processName = None):
-            # Closing procedures for killed tasks
-            if len(self.killedTasks) > 0 or processName != None:
-                # Killing process
-                for processName in self.killedTasks:
-                    # Terminate processes (cleanup processing)
-                    for process in getattr(self, processName + 'ProcessList'):
-                        getattr(self, processName + 'Display')[0].set(('Killing ' + processName))
-                        getattr(self, processName + 'Display')[1].update()
-                        process.terminate()
-                        print process.name
-
-                    # Update first display message
-                    getattr(self, processName + 'Display')[0].set((processName + ' ended by analyst...'))
-                    getattr(self, processName + 'Display')[1].update()
-
-                    # Enable process menu if finished
-                    self._enableActionableWidgets(getattr(self, processName + 'WidgetList'))
-
-                    # Remove process name from killed list
-                    self.killedTasks.remove(processName)
-
-                    # Disable Kill Button
-                    getattr(self, (processName + 'KillButton')).config(state = Tkinter.DISABLED)
-
-        # Pull results from multiprocessing manager queue and update respective tabs
-        while self.resultsQueue.empty() == False:
-            # Grab presorted result from queue
-            resultString = self.resultsQueue.get()
-
-            # Determine which process is associated with result
-            processName = re.search(r'(\w*Fix)', resultString).group(1)
-
-            # Determine the errors and results list box elements
-            errorsListBox = getattr(self, processName + 'ELB')
-            resultsListBox = getattr(self, processName + 'RLB')
-
-            # Progress variables
-            progressValueVar = getattr(self, processName + 'Progress')[0]
-            progressBar = getattr(self, processName + 'Progress')[1]
-
-            # Display variables
-            displayTextVar1 = getattr(self, processName + 'Display')[0]
-            statusEntry1 = getattr(self, processName + 'Display')[1]
-            displayTextVar2 = getattr(self, processName + 'Display')[2]
-            statusEntry2 = getattr(self, processName + 'Display')[3]
-
-            # Add error to error list box
-            if "Error: " in resultString and processName in resultString:                
-                # Increment error count by 1
-                setattr(self, processName + 'ErrorCount', (getattr(self, processName + 'ErrorCount') + 1))
-
-                # Add error to associated list box
-                errorEntry = str(getattr(self, processName + 'ErrorCount')) + ': '+ ' | '.join(resultString.replace(processName, '').split('\t'))
-                errorsListBox.insert('end', errorEntry)
-
-            elif "Error: " not in resultString and processName in resultString:
-                # Increment progress count + 1
-                setattr(self, processName + 'ProgressCount', (getattr(self, processName + 'ProgressCount') + 1))              
-                
-                # Add result to associated list box
-                resultEntry = str(getattr(self, processName + 'ProgressCount')) + ': '\
-                              + ' | '.join(resultString.replace(processName, '').split('\t'))
-                resultsListBox.insert('end', resultEntry)
-
-            # Set progress bar integer
-            assignedTasks = len(getattr(self, processName + 'AssignedTasks'))
-            incompleteCount = assignedTasks - (getattr(self, processName + 'ProgressCount') + getattr(self, processName + 'ErrorCount'))
-
-            # Check if process is complete
-            if processName in self.completedTasks:
-                # Check completed tasks list
-                checkCompletedTasks(processName)
-
-            # Check if process is ended by analyst
-            elif processName in self.killedTasks:
-                # Check killed tasks list
-                checkKilledTasks(processName)
-    
-            # Progress handler
-            elif incompleteCount == 0:                              
+        def checkKilledTasks():
+            # Closing procedures for killed tasks (the menu is given back
+            # once the engine reports the run killed)
+            while self.killedTasks:
+                runState = self.killedTasks.pop(0)
+
+                # Drop the tasks the pool has not started yet and ask the
+                # running ones to stop (the engine terminates stragglers)
+                self.engine.killRun(runState.run)
+                self._markRun(runState)
+
+                # Disable Kill Button
+                runState.killButton.config(state = Tkinter.DISABLED)
+
+        # Collect results until the engine's channel is empty or the tick's
+        # time budget runs out; anything left waits for the next tick
+        updatedRuns, resultsBacklog = self.engine.poll(self.updateTimeBudget)
+
+        # Render each updated tab in the next frame and close finished runs
+        for run in updatedRuns:
+            # Skip late results of a tab's previous run
+            runState = self.runStates.get(run.toolName)
+            if runState == None or runState.run is not run:
+                continue
+            self._markRun(runState)
+
+            # Process already complete or ended by analyst
+            if runState in self.completedTasks or runState in self.killedTasks:
+                continue
 
+            # Progress handler
+            elif run.status == 'completed':
                 # Add task to completed task list
-                self.completedTasks.append(processName)
+                self.completedTasks.append(runState)
 
-            # Once tasks are started begin printing status messages
-            elif incompleteCount != 0 and incompleteCount != assignedTasks:
-                # Update first message display with remaining tasks
-                displayTextVar1.set(('Remaining tasks: ' + str(incompleteCount)))
-                statusEntry1.update()
-
-                # Update progress bar
-                progressValueVar.set((getattr(self, processName + 'ProgressCount') + getattr(self, processName + 'ErrorCount')))
-                progressBar.update()
-
-                # Get int value of progress completed so far
-                progressValue = int(round(float(assignedTasks - incompleteCount)/float(assignedTasks) * 100, 0))
-
-                # Update second message
-                displayTextVar2.set((str(progressValue) + '% Complete'))
-                statusEntry2.update()
-            else:
-                displayTextVar1.set('Initializing converters...')
-                statusEntry1.update()
+            # Killed once its running tasks stopped, or preprocessing or the
+            # tool raised: give the menu back (the run's log is finalized)
+            elif run.status in ('killed', 'failed'):
+                self._enableActionableWidgets(runState.widgetList)
+                runState.resetButton.config(state = Tkinter.NORMAL)
+                runState.logButton.config(state = Tkinter.NORMAL if run.retired
+                                          else Tkinter.DISABLED)
+                runState.killButton.config(state = Tkinter.DISABLED)
 
         # Check killed tasks list
         checkKilledTasks()
 
         # Check completed tasks list
         checkCompletedTasks()
+
+        # Update CPU Resources (after polling, so the last update before the
+        # GUI goes idle shows the finished runs' workers released)
+        self.renderScheduler.mark(self.CPUMainEntry, self._updateCPUResources)
                     
-        # After 100 milliseconds rerun update GUI
-        self.root.after(100, self._updateGUI)
+        # Rerun update GUI right after Tk has redrawn when results are still
+        # waiting and on a timer while runs change without results arriving;
+        # otherwise the engine's next results wake it
+        if resultsBacklog:
+            self._scheduleUpdate(10)
+        elif not self.resultsEvents:
+            self._scheduleUpdate(100)
+        elif self.engine.needsPolling():
+            self._scheduleUpdate(self.statusInterval)
+
+    # Class Function: Render a tab's run in the next frame
+    def _markRun(self, runState):
+        self.renderScheduler.mark(runState, functools.partial(self._renderRun,
+                                                              runState))
+
+    # Class Function: Show a tab's run: its visible rows, dashboard, column
+    # statistics, status messages and progress
+    def _renderRun(self, runState):
+        run = runState.run
+        processName = runState.processName
+        if run == None:
+            return
+
+        # Redraw the errors and results views
+        runState.errorsView.refresh()
+        runState.resultsView.refresh()
+
+        # Set progress bar integer
+        assignedTasks = run.taskCount
+        incompleteCount = run.incompleteCount()
+        runState.progressBar.config(maximum = max(1, assignedTasks))
+
+        # Refresh the throughput, latency, utilization and ETA dashboard
+        runState.dashboardTextVar.set(run.metrics.dashboard(incompleteCount))
+
+        # Refresh the running statistics of the result columns
+        runState.columnStatsListBox.delete(0, Tkinter.END)
+        columnStatsLines = run.columnStats.lines()
+        if columnStatsLines:
+            runState.columnStatsListBox.insert(Tkinter.END, *columnStatsLines)
+
+        # Completed: fill the progress bar
+        if run.status == 'completed':
+            runState.displayTextVar1.set((processName + ' completed.'))
+            runState.displayTextVar2.set('100% Complete')
+            runState.progressValueVar.set(max(1, assignedTasks))
+
+        # Killed, or being killed, by the analyst
+        elif run.status in ('killing', 'killed'):
+            runState.displayTextVar1.set((processName + ' ended by analyst...'))
+
+        # Preprocessing or the tool raised: show why
+        elif run.status == 'failed':
+            if run.preprocess != None and run.preprocess.error != None:
+                runState.displayTextVar1.set((processName + ' preprocessing failed.'))
+            else:
+                runState.displayTextVar1.set((processName + ' failed.'))
+            runState.displayTextVar2.set(run.error)
+
+        # Show the preprocessing progress until the tasks are dispatched
+        elif run.preprocessing():
+            runState.displayTextVar1.set(run.preprocess.status())
+            runState.displayTextVar2.set(('Discovered: ' + str(assignedTasks) + '...'))
+
+        # Show discovered vs. completed counts while discovery runs
+        elif not run.discoveryDone:
+            runState.displayTextVar1.set(('Completed: ' + str(assignedTasks - incompleteCount)))
+            runState.progressValueVar.set(assignedTasks - incompleteCount)
+            runState.displayTextVar2.set(('Discovered: ' + str(assignedTasks) + ' (' + str(run.skippedCount) + ' done earlier)...'))
+
+        # Once tasks are started begin printing status messages
+        elif incompleteCount != assignedTasks:
+            # Update first message display with remaining tasks, final
+            # errors and retried errors
+            runState.displayTextVar1.set(('Remaining tasks: ' + str(incompleteCount)
+                                          + ' | Errors: ' + str(run.errorCount)
+                                          + ' | Retries: ' + str(run.retryCount)))
+
+            # Update progress bar
+            runState.progressValueVar.set(assignedTasks - incompleteCount)
+
+            # Get int value of progress completed so far
+            progressValue = int(round(float(assignedTasks - incompleteCount)/float(assignedTasks) * 100, 0))
+
+            # Update second message
+            runState.displayTextVar2.set((str(progressValue) + '% Complete'))
+        else:
+            runState.displayTextVar1.set('Initializing converters...')
 
     # Class Function: Enable actionable widgets
     def _enableActionableWidgets(self, widgets):
@@ -378,15 +444,11 @@ class MultiMenu:
             elif widget.widgetName == 'button':                                        
                 widget.config(state = Tkinter.NORMAL)
         
-    # Class Function: List splitter
-    def _chunkList(self, listObject, subLists):
-        return numpy.array_split(numpy.array(listObject), subLists)
-
     # Class Function: Generic kill process
     def _killProcess(self, processName):
-        # Set appropriate kill
-        setattr(self, processName + 'KillBoolean', True)
-        self.killedTasks.append(processName)
+        # Queue the tab's run for cancellation
+        self.killedTasks.append(self.runStates[processName])
+        self._scheduleUpdate(0)
 
     # Class Function: Assign functions based on process chosen
     def _assignProcess(self,
@@ -394,31 +456,24 @@ class MultiMenu:
                        processName,
                        cpuStringVar,
                        justLogVar,
+                       profileVar,
                        resultsKeyListBox,
-                       errorsKeyListBox,
-                       resultsListBox,
-                       errorsListBox,
-                       killButton,
-                       progressValueVar,
-                       progressBar,
-                       displayTextVar1,
-                       statusEntry1,
-                       displayTextVar2,
-                       statusEntry2,
-                       resetButton,
-                       logButton):
-
-        # Retrieve cpus chosen by analyst
-        cpusAllocated = int(cpuStringVar.get())
+                       errorsKeyListBox):
+
+        # Tab's widgets and run
+        runState = self.runStates[processName]
+
+        # Retrieve cpu share chosen by analyst
+        cpuShare = int(cpuStringVar.get())
        
-        # Only move forward if the analyst has selected at least one cpu
-        if cpusAllocated > 0:            
+        # Only move forward if the analyst has selected a cpu share
+        if cpuShare > 0:            
             
             # Start loop for error processing
             while True:
 
                 # Only process data if "task" [test keyword] is not in processname
-                if 'task' not in processName:
+                if not taskEngine.isTestTool(processName):
                     processTest = False
 
                     # Get input folder
@@ -438,177 +493,75 @@ class MultiMenu:
                 # Do not accept no entry for either input or output folder
                 if inputFolder != outputFolder and inputFolder != '' and outputFolder != '' or processTest == True:
 
-                    # Clear results list box
-                    resultsListBox.delete(0, Tkinter.END)
-                    resultsListBox.update()
+                    # Clear results view
+                    runState.resultsView.clear()
 
-                    # Clear error list box
-                    errorsListBox.delete(0, Tkinter.END)
-                    errorsListBox.update()
+                    # Clear errors view
+                    runState.errorsView.clear()
 
                     # Clear first status message
-                    displayTextVar1.set('')
-                    statusEntry1.update()
-
-                    # Clear second status message
-                    displayTextVar1.set('')
-                    statusEntry1.update()
+                    runState.displayTextVar1.set('')
 
                     # Create widget list that require disabling prior to processing
-                    widgetList = [x for x in menuFrame.winfo_children()
-                           if x.widgetName == 'ttk::combobox'
-                           or x.widgetName == 'button']
+                    runState.widgetList = [x for x in menuFrame.winfo_children()
+                                           if x.widgetName == 'ttk::combobox'
+                                           or x.widgetName == 'button']
 
                     # Disable all actionable widgets
-                    for widget in widgetList:
+                    for widget in runState.widgetList:
                         widget.config(state = 'disabled')
-                        widget.update()
-
-                    # Build common environment variables
-                    setattr(self, (processName + 'TimeStarted'), time.ctime())
-                    setattr(self, (processName + 'AssignedTasks'), [])
-                    setattr(self, (processName + 'ErrorCount'), 0)
-                    setattr(self, (processName + 'ProgressCount'), 0)
-                    setattr(self, (processName + 'WidgetList'), [])
-                    setattr(self, (processName + 'ProcessList'), [])
-                    setattr(self, (processName + 'RLB'), None)
-                    setattr(self, (processName + 'ELB'), None)
-                    setattr(self, (processName + 'Display'), None)
-                    setattr(self, (processName + 'Progress'), None)
-                    setattr(self, (processName + 'KillBoolean'), False)
-                    setattr(self, (processName + 'KillButton'), killButton)
-                    setattr(self, (processName + 'ResetButton'), resetButton)
-                    setattr(self, (processName + 'LogButton'), logButton)
-
-                    # Set up assigned task list variable
-                    objectList = []
-
-                    # Import process module
-                    module = __import__(self.toolsDictionary[processName])
-
-                    # Retrieve results key
-                    setattr(self, (processName + 'ResultsKey'), getattr(module, 'resultsKey')())
-
-                    # Retrieve results key
-                    setattr(self, (processName + 'ErrorsKey'), getattr(module, 'errorsKey')())
-
-                    # Retrieve the pre process variable
-                    setattr(self, (processName + 'PreProcess'), getattr(module, 'pre_ProcessVariable')())
-
-                    # If the pre process variable is True
-                    # Define the pre process method to call from imported module
-                    if getattr(self, processName + 'PreProcess') == True:
-                        preMethodToCall = getattr(module, 'pre_' + processName)
-
-                    # Obtain preprocess list
-                    if getattr(self, processName + 'PreProcess') == True:
-                        preprocessVariable = preMethodToCall(inputFolder, outputFolder)
-                    else:
-                        preprocessVariable = []
 
-                    # Set kill process boolean to false
-                    setattr(self, processName + 'KillBoolean', False)
-
-                    # Define the method to call from imported module
-                    methodToCall = getattr(module, processName)
-
-                    # Build list of full file path to each object path
+                    # Input objects are discovered by the engine in the
+                    # background while the first ones are already processing
                     if processTest == False:
-                        for root, folder, files in os.walk(inputFolder):
-                            for filename in files:
-                                if filename[-3:] in self.allowedImageFormats:
-                                    # Display message when object is found
-                                    displayTextVar2.set(('Found object: ' + filename.split('.')[0]))
-                                    statusEntry2.update()                            
-
-                                    # Add object to list for processing
-                                    objectList.append(os.path.join(root, filename))
-
-                        # Set assigned tasks variable the value of the local object list
-                        setattr(self, processName + 'AssignedTasks', objectList)
+                        objectList = None
                     else:
                         # Set up test list of 100
                         objectList = range(100)
 
-                        # Set assigned tasks variable the value of the local object list
-                        setattr(self, processName + 'AssignedTasks', objectList)
-
-                    # Set maximum value of progressbar to number of tasks
-                    progressBar.config(maximum = len(objectList))
-                    progressBar.update()
-
-                    # Set list of actionable widgets for process name
-                    setattr(self, processName + 'WidgetList', widgetList)
-
-                    # Set results and error list box instances
-                    setattr(self, processName + 'RLB', resultsListBox)
-                    setattr(self, processName + 'ELB', errorsListBox)
-
-                    # Set process name progress variables
-                    setattr(self, processName + 'Progress', [progressValueVar,
-                                                             progressBar])
-                    # Set process name display variables
-                    setattr(self, processName + 'Display', [displayTextVar1,
-                                                             statusEntry1,
-                                                             displayTextVar2,
-                                                             statusEntry2])
-                    
                     # Clear second status message
-                    displayTextVar2.set('')
-                    statusEntry2.update()                      
-
-                    # Assign tasks to processing thread by sublists of length
-                    # determined by number of cpus allocated
-                    splitCount = 0
-                    processList = getattr(self, processName + 'ProcessList', widgetList)
-                    for splitListPart in self._chunkList(objectList, cpusAllocated):
-                        
-                        for assignmentVariable in splitListPart:
-                            
-                            # Update display text 1 with assigned task
-                            if processTest == False:
-                                displayTextVar1.set(('Processing: ' + os.path.basename(assignmentVariable).split('.')[0]))
-                            else:
-                                displayTextVar1.set(('Processing Test Task: ' + str(assignmentVariable)))
-
-                            # Update first status message
-                            statusEntry1.update()
-
-                        # Process function and variable assignment 
-                        newProcess = multiprocessing.Process(target = methodToCall, name = processName + str(splitCount),
-                                                             args = (splitListPart,
-                                                             outputFolder,
-                                                             preprocessVariable,
-                                                             justLogVar.get(),
-                                                             self.resultsQueue))
-
-                        # Append new process to the list
-                        processList.append(newProcess)
-                        setattr(self, processName + 'ProcessList', processList)
-
-                        # Increment split count by one
-                        splitCount += 1
-
-                        # Start the process
-                        newProcess.start()
+                    runState.displayTextVar2.set('')
+
+                    # Clear the dashboard and column statistics
+                    runState.dashboardTextVar.set('')
+                    runState.columnStatsListBox.delete(0, Tkinter.END)
+
+                    # Start the run on the engine's warm worker pool, which
+                    # shares every cpu among the active runs weighted by
+                    # their cpu share
+                    run = self.engine.startRun(processName,
+                                               objectList,
+                                               inputFolder,
+                                               outputFolder,
+                                               cpuShare,
+                                               justLogVar.get(),
+                                               profileVar.get() == 'YES')
+                    runState.run = run
+
+                    # Follow the run's preprocessing and discovery
+                    self._scheduleUpdate(0)
+
+                    # Show the run's results and errors in the tab's views
+                    runState.resultsView.setStore(run.resultsStore)
+                    runState.errorsView.setStore(run.errorsStore)
 
                     # Set results list key entry
-                    resultsKeyListBox.insert('end', eval('self.' + str(processName) + 'ResultsKey'))
+                    resultsKeyListBox.insert('end', run.resultsKey)
 
                     # Set errors list key entry
-                    errorsKeyListBox.insert('end', eval('self.' + str(processName) + 'ErrorsKey'))
+                    errorsKeyListBox.insert('end', run.errorsKey)
 
                     # Update first status entry
-                    displayTextVar1.set('')
-                    statusEntry1.update()
+                    runState.displayTextVar1.set('')
 
                     # Update second status entry
-                    displayTextVar2.set('All Tasks Assigned.')
-                    statusEntry2.update()
+                    if processTest == False:
+                        runState.displayTextVar2.set('Discovering objects...')
+                    else:
+                        runState.displayTextVar2.set('All Tasks Assigned.')
 
                     # Enable kill process button
-                    killButton.config(state = Tkinter.NORMAL)
-                    killButton.update()
+                    runState.killButton.config(state = Tkinter.NORMAL)
 
                     break
                 elif inputFolder == outputFolder:
@@ -621,7 +574,7 @@ class MultiMenu:
         else:
             # Display cpu resource error to user
             self.messageBox(None,
-                            "User must allocate at least one cpu thread.",
+                            "User must choose a cpu share of at least one.",
                             'CPU Resource Error:',
                             self.messageBoxDictionary['HAND']\
                             |self.messageBoxDictionary['OK'])
@@ -633,12 +586,16 @@ class MultiMenu:
         tabFrameName = menuFrame.winfo_name()
 
         # CPU resource label
-        CPUSubLabel = Tkinter.Label(menuFrame, text = 'CPU Thread(s):')
+        CPUSubLabel = Tkinter.Label(menuFrame, text = 'CPU Share:')
         CPUSubLabel.grid(column = 0, row = 0, sticky = Tkinter.E)
 
         # Processing log label
         processingLogLabel = Tkinter.Label(menuFrame, text = 'Log Only')
         processingLogLabel.grid(column = 1, row = 0, sticky = Tkinter.W)
+
+        # Profiling label
+        profileLabel = Tkinter.Label(menuFrame, text = 'Profile')
+        profileLabel.grid(column = 1, row = 0, sticky = Tkinter.E)
         
         # Sub Function: Control scroll bar 2 to x view on the key entry
         # and results list
@@ -653,105 +610,78 @@ class MultiMenu:
 
         # Sub Function: Reset Menu
         def resetMenu():
-            # Reset cpu resource choice combo box
-            cpusVar.set('0')
-            cpu_Combo_Box.update()
+            # Forget the tab's run so its late updates leave the menu alone
+            self.runStates[tabFrameName].run = None
+
+            # Reset cpu share choice combo box
+            cpusVar.set('1')
 
             # Reset log choice combobox
             justLogVar.set('NO')
-            log_Combo_Box.update()
+
+            # Reset profile choice combobox
+            profileVar.set('NO')
 
             # Clear results key list box
             resultsKeyListBox.delete(0, Tkinter.END)
-            resultsKeyListBox.update()
 
-            # Clear results list box
-            resultsListBox.delete(0, Tkinter.END)
-            resultsListBox.update()
+            # Clear results view
+            resultsView.clear()
 
-            # Clear error list box
-            errorsListBox.delete(0, Tkinter.END)
-            errorsListBox.update()
+            # Clear errors view
+            errorsView.clear()
 
             # Reset first display message entry
             displayText1.set('')
-            statusMessage1.update()
             
             # Reset second display message entry
             displayText2.set('')
-            statusMessage2.update()
+
+            # Reset dashboard entry and column statistics
+            dashboardText.set('')
+            columnStatsListBox.delete(0, Tkinter.END)
 
             # Reset progress bar
             progressValueVar.set(0)
-            progressBar.update()
 
             # Disable reset button
             resetButton.config(state = Tkinter.DISABLED)
-            resetButton.update()
 
             # Disable log button
             logButton.config(state = Tkinter.DISABLED)
-            logButton.update()
 
             # Put focus on start button
             startButton.focus()
-            startButton.update()
 
         # Sub Function: Write results to log file
         def generateLog(processName):
 
-            # Get results key
-            resultsKey = resultsKeyListBox.get(0)
+            # Finalize the streamed run log
+            run = self.runStates[processName].run
+            run.closeLog('ended')
 
-            # Get errors key
-            errorsKey = errorsKeyListBox.get(0)
-            
-            # Get results from results list box
-            resultsList = resultsListBox.get(0, Tkinter.END)
+            # Get folder path from user to save log file
+            logFolder = str(tkFileDialog.askdirectory(parent = menuFrame,
+                                                      title = "Please select an input folder for log file."))
 
-            # Get errors from error list box
-            errorsList = errorsListBox.get(0, Tkinter.END)
+            # Copy the run log and its profile report into the chosen folder
+            if logFolder != '':
+                shutil.copy(run.runLog.logFilePath, logFolder)
+                if run.profileReportPath != None:
+                    shutil.copy(run.profileReportPath, logFolder)
 
-            # Get folder path from user to save log file
-            inputFolder = str(tkFileDialog.askdirectory(parent = menuFrame,
-                                                        title = "Please select an input folder for log file."))
-
-            # Create log file name
-            logFilePath = os.path.join(inputFolder, (tabFrameName + "_" + time.ctime().replace(' ','_').replace(':','-') + '.txt'))
-
-            # Write start and end process times to log
-            with open(logFilePath, 'w+') as logFile:
-                logFile.write((tabFrameName + ' time started: ' + (getattr(self, (processName + "TimeStarted"), time.ctime())) + '\n' + '\n'))
-                logFile.write((tabFrameName + ' time ended: ' + (getattr(self, (processName + "TimeEnded"), time.ctime())) + '\n' + '\n'))
-
-                # Results
-                logFile.write('Results:' + '\n')
-                logFile.write((resultsKey + '\n'))
-                if len(resultsList) > 0:
-                    for lineItem in resultsList:
-                        logFile.write((lineItem + '\n'))
-                else:
-                    logFile.write('There is nothing to log.\n')
-                    
-                # Errors
-                logFile.write('\n' + 'Errors:' + '\n')
-                logFile.write((errorsKey + '\n'))
-                if len(errorsList) > 0:
-                    for lineItem in errorsList:
-                        logFile.write((lineItem + '\n'))
-                else:
-                    logFile.write('There is nothing to log.\n')
-                    
         # Start button
         startButton = Tkinter.Button(menuFrame, text = 'Start',
                                      state = Tkinter.NORMAL,
                                      width = 8)
         startButton.grid(column = 0, row = 2, sticky = Tkinter.W)
 
-        # Combo box for cpu resource tracking
+        # Combo box for the tab's cpu share: active runs split the cpus in
+        # proportion to their shares, so a share of 2 gets twice the cpus of
+        # a share of 1 and a lone run uses every cpu
         cpusVar = Tkinter.StringVar()
-        cpusVar.set('0')
-        cpusVarValues = list(xrange(0, self.cpuThreadCount + 1))
+        cpusVar.set('1')
+        cpusVarValues = list(xrange(1, self.cpuThreadCount + 1))
         cpu_Combo_Box = ttk.Combobox(menuFrame,
                                      width = 2,
                                      state = 'readonly',
@@ -759,12 +689,6 @@ class MultiMenu:
                                      values = cpusVarValues)
         cpu_Combo_Box.grid(column = 0, row = 2, sticky = Tkinter.E)
 
-        # Add cpu resource variable to the main tracker
-        self.cpuTrackers.append(cpusVar)
-
-        # Add cpu comboboxes to list
-        self.cpuEntries.append(cpu_Combo_Box)
-
         # Combo box for either running through the process
         # or just logging the results
         justLogVar = Tkinter.StringVar()
@@ -776,6 +700,16 @@ class MultiMenu:
                                      values = ['YES', 'NO'])
         log_Combo_Box.grid(column = 1, row = 2, sticky = Tkinter.W)
 
+        # Combo box for profiling the tool's workers
+        profileVar = Tkinter.StringVar()
+        profileVar.set('NO')
+        profile_Combo_Box = ttk.Combobox(menuFrame,
+                                         width = 3,
+                                         state = 'readonly',
+                                         textvariable = profileVar,
+                                         values = ['YES', 'NO'])
+        profile_Combo_Box.grid(column = 1, row = 2, sticky = Tkinter.E)
+
         # Create list box for results
         resultsListLabel = Tkinter.Label(menuFrame, text = 'Results:')
         resultsListLabel.grid(column = 0, row = 4, sticky = Tkinter.W)
@@ -799,9 +733,13 @@ class MultiMenu:
                           sticky = (Tkinter.W, Tkinter.S, Tkinter.E))
 
         # Set the X and Y scroll commands to the appropriate scroll bars
-        resultsListBox['yscrollcommand'] = scrollBarOne.set
         resultsListBox['xscrollcommand'] = scrollBarTwo.set
 
+        # Results view rendering only the visible rows of the results store
+        resultsStore = resultStore.ResultStore()
+        resultsView = virtualList.VirtualList(resultsListBox, scrollBarOne,
+                                              resultsStore)
+
         # Create list box for results display
         errorsListLabel = Tkinter.Label(menuFrame, text = 'Errors Key:')
         errorsListLabel.grid(column = 0, row = 8, sticky = Tkinter.W)
@@ -827,7 +765,11 @@ class MultiMenu:
 
         # Set the X and Y scroll command to the appropriate scroll bars
         errorsListBox['xscrollcommand'] = errorScrollHor.set
-        errorsListBox['yscrollcommand'] = errorScrollVert.set
+
+        # Errors view rendering only the visible rows of the errors store
+        errorsStore = resultStore.ResultStore()
+        errorsView = virtualList.VirtualList(errorsListBox, errorScrollVert,
+                                             errorsStore)
 
         # Create readonly entry for displaying result keys
         resultsKeyListBoxLabel = Tkinter.Label(menuFrame, text = 'Results key:')
@@ -851,54 +793,85 @@ class MultiMenu:
                                sticky = Tkinter.W)
         errorsKeyListBox['xscrollcommand'] = errorScrollHor.set
 
+        # Create read only entry for the live throughput dashboard
+        dashboardLabel = Tkinter.Label(menuFrame, text = 'Throughput:')
+        dashboardLabel.grid(column = 0, row = 12, sticky = Tkinter.W)
+        dashboardText = Tkinter.StringVar()
+        dashboardEntry = ttk.Entry(menuFrame, width = 70, state = 'readonly',
+                                   textvariable = dashboardText)
+        dashboardEntry.grid(column = 0, columnspan = 2, row = 13,
+                            sticky = (Tkinter.W, Tkinter.E))
+
+        # Create list box for the running statistics of the result columns
+        columnStatsLabel = Tkinter.Label(menuFrame, text = 'Column statistics:')
+        columnStatsLabel.grid(column = 0, row = 14, sticky = Tkinter.W)
+        columnStatsListBox = Tkinter.Listbox(menuFrame, height = 3, width = 70,
+                                             state = Tkinter.NORMAL)
+        columnStatsListBox.grid(column = 0, columnspan = 2, row = 15,
+                                sticky = (Tkinter.W, Tkinter.E))
+
         # Create read only entry for displaying program proces updates
         statusLabel = Tkinter.Label(menuFrame, text = 'Status 1:')
-        statusLabel.grid(column = 0, row = 14, sticky = Tkinter.W)
+        statusLabel.grid(column = 0, row = 16, sticky = Tkinter.W)
         displayText1 = Tkinter.StringVar()
         statusMessage1 = ttk.Entry(menuFrame, width = 30, state = 'readonly',
                                   textvariable = displayText1)
-        statusMessage1.grid(column = 0, row = 15, sticky = (Tkinter.W,
+        statusMessage1.grid(column = 0, row = 17, sticky = (Tkinter.W,
                                                             Tkinter.E))
 
         # Create second read only entry for displaying program progress updates
         statusLabel2 = Tkinter.Label(menuFrame, text = 'Status 2:')
-        statusLabel2.grid(column = 1, row = 14, sticky = Tkinter.W)
+        statusLabel2.grid(column = 1, row = 16, sticky = Tkinter.W)
         displayText2 = Tkinter.StringVar()
         statusMessage2 = ttk.Entry(menuFrame, width = 25, state = 'readonly',
                                    textvariable = displayText2)
 
-        statusMessage2.grid(column = 1, row = 15, sticky = (Tkinter.W,
+        statusMessage2.grid(column = 1, row = 17, sticky = (Tkinter.W,
                                                             Tkinter.E))
 
         # Create progress bar
         progressLabel = Tkinter.Label(menuFrame, text = "Progress Bar:")
-        progressLabel.grid(column = 0, row = 16, sticky = Tkinter.W)
+        progressLabel.grid(column = 0, row = 18, sticky = Tkinter.W)
         progressValueVar = Tkinter.IntVar() 
         progressBar = ttk.Progressbar(menuFrame, orient = Tkinter.HORIZONTAL,
                                     length = 130, mode = 'determinate',
                                     variable = progressValueVar)
-        progressBar.grid(column = 0, row = 17, sticky = (Tkinter.E, Tkinter.W))
+        progressBar.grid(column = 0, row = 19, sticky = (Tkinter.E, Tkinter.W))
 
         # Create button for killing menu's processing
         action_with_arg_Kill = functools.partial(self._killProcess,
                                                  tabFrameName)
         killButton = Tkinter.Button(menuFrame, text = 'Kill Process',
                                     state = Tkinter.DISABLED)
-        killButton.grid(column = 0, row = 18, sticky = Tkinter.W)
+        killButton.grid(column = 0, row = 20, sticky = Tkinter.W)
         killButton.config(command = action_with_arg_Kill)
 
         # Create button for resetting menu
         resetButton = Tkinter.Button(menuFrame, text = 'Reset Menu',
                                      state = Tkinter.DISABLED,
                                      command = resetMenu)
-        resetButton.grid(column = 0, row = 19, sticky = Tkinter.W)
+        resetButton.grid(column = 0, row = 21, sticky = Tkinter.W)
 
         # Create button for logging process errors/results
         action_with_arg_Log = functools.partial(generateLog, tabFrameName)
         logButton = Tkinter.Button(menuFrame, text = 'Create Log',
                                    state = Tkinter.DISABLED,
                                    command = action_with_arg_Log)        
-        logButton.grid(column = 1, columnspan = 2, row = 17, sticky = Tkinter.E)        
+        logButton.grid(column = 1, columnspan = 2, row = 19, sticky = Tkinter.E)        
+
+        # Keep the widgets the GUI update routine refreshes with the tab's run
+        self.runStates[tabFrameName] = RunState(tabFrameName,
+                                                resultsView,
+                                                errorsView,
+                                                displayText1,
+                                                displayText2,
+                                                progressValueVar,
+                                                progressBar,
+                                                dashboardText,
+                                                columnStatsListBox,
+                                                killButton,
+                                                resetButton,
+                                                logButton)
 
         # Add arguments to the start button command
         action_with_arg = functools.partial(self._assignProcess,
@@ -906,19 +879,9 @@ class MultiMenu:
                                             tabFrameName,
                                             cpusVar,
                                             justLogVar,
+                                            profileVar,
                                             resultsKeyListBox,
-                                            errorsKeyListBox,
-                                            resultsListBox,
-                                            errorsListBox,
-                                            killButton,
-                                            progressValueVar,
-                                            progressBar,
-                                            displayText1,
-                                            statusMessage1,
-                                            displayText2,
-                                            statusMessage2,
-                                            resetButton,
-                                            logButton)
+                                            errorsKeyListBox)
         startButton.config(command = action_with_arg)
 
         # Update sub menu
@@ -956,8 +919,8 @@ class MultiMenu:
         # Main menu
         # CPU Count Label
         self.CPUEntryVar = Tkinter.StringVar()
-        self.CPUEntryVar.set(('Number of CPUs available for tasking: ['+ str(self.cpuThreadCount)) + ']')
-        self.CPUMainEntry = Tkinter.Entry(self.masterFrame, width = 37,
+        self.CPUEntryVar.set(('CPUs busy: [0/'+ str(self.cpuThreadCount)) + ']')
+        self.CPUMainEntry = Tkinter.Entry(self.masterFrame, width = 60,
                                      textvariable = self.CPUEntryVar,
                                      state = 'readonly')
         self.CPUMainEntry.grid(column = 0, row = 0, sticky = (Tkinter.N, Tkinter.W))
@@ -988,7 +951,11 @@ class MultiMenu:
 
 # Run GUI in main thread
 if __name__ == '__main__':
-    MultiMenu()._buildMainMenu()
+    multiMenu = MultiMenu()
+    multiMenu._buildMainMenu()
+
+    # Stop the task engine
+    multiMenu.engine.shutdown()
 
     # Exit application
     sys.exit()
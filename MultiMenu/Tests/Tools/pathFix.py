@@ -0,0 +1,18 @@
+# Test tool reporting every input path it is given
+
+# Define preproces variable
+def pre_ProcessVariable():
+    return False
+
+# Define preprocess keys
+def resultsKey():
+    return 'Input Path | Size'
+
+# Define preprocess keys
+def errorsKey():
+    return 'Input Path | Error Message'
+
+# Path Fix Function
+def pathFix(variableList, destinationFolder, preProcessVariable, logOnly, queue):
+    for variable in variableList:
+        queue.result(variable, (0.0,), 'Logged.' if logOnly == 'YES' else 'Done.')
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+# Modules for task engine tests
+import os, shutil, sys, tempfile, unittest
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(testsFolder))
+import taskEngine
+
+################################################################################
+# Class object: Runs of the engine on discovered inputs
+class TaskEngineTest(unittest.TestCase):
+    # Class Function: Start an engine on the test tools and empty folders
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.inputFolder = os.path.join(self.folder, 'input')
+        self.outputFolder = os.path.join(self.folder, 'output')
+        os.makedirs(self.inputFolder)
+        os.makedirs(self.outputFolder)
+        for x in xrange(3):
+            with open(os.path.join(self.inputFolder, 'chart' + str(x) + '.kap'),
+                      'w') as inputFile:
+                inputFile.write('RA=10,20\n')
+        self.engine = taskEngine.TaskEngine(
+            1, os.path.join(self.folder, 'Logs'), keepResults = False,
+            toolFolders = (os.path.join(testsFolder, 'Tools'),))
+
+    # Class Function: Stop the engine and remove the folders
+    def tearDown(self):
+        self.engine.shutdown()
+        shutil.rmtree(self.folder)
+
+    # Class Function: Run pathFix on the input folder until it is retired
+    def runTool(self, logOnly):
+        run = self.engine.startRun('pathFix', None, self.inputFolder,
+                                   self.outputFolder, 1, logOnly)
+        while run.jobId in self.engine.runs:
+            self.engine.poll(0.05, timeout = 0.1)
+        return run
+
+    # Class Function: A log only run leaves its inputs to the next real run
+    def testLogOnlyRunDoesNotSkipInputs(self):
+        logRun = self.runTool('YES')
+        self.assertEqual((logRun.status, logRun.progressCount), ('completed', 3))
+        run = self.runTool('NO')
+        self.assertEqual((run.status, run.progressCount, run.skippedCount),
+                         ('completed', 3, 0))
+        run = self.runTool('NO')
+        self.assertEqual((run.status, run.taskCount, run.skippedCount),
+                         ('completed', 0, 3))
+
+if __name__ == '__main__':
+    unittest.main()
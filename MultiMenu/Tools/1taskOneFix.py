@@ -2,7 +2,7 @@
 # Change all taskOne instances to the next number for seperate menu tab creation
 
 # Modules for test
-import os, random, time
+import os, random, testTask
 
 # Define preproces variable
 def pre_ProcessVariable():
@@ -22,28 +22,37 @@ def taskOneFix(variableList, destinationFolder, preProcessVariable, logOnly, que
         number = random.randint(0, 1000)
 
         # Random sleep time for simulating processing of different types of objects
-        time.sleep(random.randint(1, 10))
+        if not testTask.simulateWork(queue, random.randint(1, 10)):
+            return
 
         # Create random decimal to 3 places
-        randomDecimalOne = str(random.randint(2, 6) * random.randint(1, 7) * float(str(random.randint(1, 9)) + "."\
+        randomDecimalOne = (random.randint(2, 6) * random.randint(1, 7) * float(str(random.randint(1, 9)) + "."\
                                                                          + str(random.randint(1, 9))\
                                                                          + str(random.randint(1, 9))\
                                                                          + str(random.randint(1, 9))))
 
         # Create random decimal to 3 places
-        randomDecimalTwo = str(random.randint(2, 6) * random.randint(1, 7) * float(str(random.randint(1, 9)) + "."\
+        randomDecimalTwo = (random.randint(2, 6) * random.randint(1, 7) * float(str(random.randint(1, 9)) + "."\
                                                                          + str(random.randint(1, 9))\
                                                                          + str(random.randint(1, 9))\
                                                                          + str(random.randint(1, 9))))
 
         # Create random decimal to 3 places
-        randomDecimalThree = str(random.randint(2, 6) * random.randint(1, 7) * float(str(random.randint(1, 9)) + "."\
+        randomDecimalThree = (random.randint(2, 6) * random.randint(1, 7) * float(str(random.randint(1, 9)) + "."\
                                                                          + str(random.randint(1, 9))\
                                                                          + str(random.randint(1, 9))\
                                                                          + str(random.randint(1, 9))))
         # Simulate a 20 percent error rate
         if number > 200:
-            queue.put('taskOneFix' + 'randTask-' + str(number) + '\t' + randomDecimalOne + '\t' + randomDecimalTwo\
-                   + '\t' + randomDecimalThree + '\t' + 'This was a random task that multi menu is processing.')
+            queue.result('randTask-' + str(number),
+                         (randomDecimalOne, randomDecimalTwo, randomDecimalThree),
+                         'This was a random task that multi menu is processing.')
         else:
-            queue.put('taskOneFix' + 'Error: ' + 'randTask-' + str(number) + ' experienced an error.')
+            queue.error('randTask-' + str(number), 'Experienced an error.')
+
+# Task One Fix Batch Function
+# Receives a block of tasks and generates the random numbers for the whole
+# block at once
+if testTask.numpy != None:
+    def taskOneFixBatch(variableList, destinationFolder, preProcessVariable, logOnly, queue):
+        testTask.randomTaskBlock(variableList, queue)
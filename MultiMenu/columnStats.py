@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+# Modules for column statistics
+import math
+
+################################################################################
+# Class object: Streaming quantile estimate with the P-squared algorithm
+# (Jain and Chlamtac, 1985). Five markers track the minimum, the quantile,
+# the maximum and two points in between; their heights are adjusted with a
+# piecewise parabolic fit as values arrive, so memory does not grow with the
+# number of values.
+class P2Quantile(object):
+    __slots__ = ('fraction', 'count', 'heights', 'positions', 'increments')
+
+    # Initializer
+    def __init__(self, fraction):
+        self.fraction = fraction
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+
+        # Desired positions of the middle markers grow by these per value
+        self.increments = (None, fraction / 2, fraction, (1 + fraction) / 2)
+
+    # Class Function: Add a value
+    def add(self, value):
+        heights = self.heights
+        self.count += 1
+
+        # The first five values initialize the markers
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        # Shift the markers above the value's cell, extending the extreme
+        # markers (unrolled, this runs for every value)
+        positions = self.positions
+        if value < heights[2]:
+            if value < heights[0]:
+                heights[0] = value
+                positions[1] += 1
+            elif value < heights[1]:
+                positions[1] += 1
+            positions[2] += 1
+            positions[3] += 1
+        elif value < heights[3]:
+            positions[3] += 1
+        elif value > heights[4]:
+            heights[4] = value
+        positions[4] += 1
+
+        # Move the middle markers that are off their desired position by one
+        # (desired positions follow from the count)
+        for marker in (1, 2, 3):
+            offset = 1 + (self.count - 1) * self.increments[marker] - \
+                     positions[marker]
+            if (offset >= 1 and positions[marker + 1] - positions[marker] > 1) or \
+               (offset <= -1 and positions[marker - 1] - positions[marker] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(marker, step)
+                if not heights[marker - 1] < height < heights[marker + 1]:
+                    height = heights[marker] + step * \
+                             (heights[marker + step] - heights[marker]) / \
+                             float(positions[marker + step] - positions[marker])
+                heights[marker] = height
+                positions[marker] += step
+
+    # Class Function: Parabolic prediction of a marker's height after moving
+    # it by step
+    def _parabolic(self, marker, step):
+        heights, positions = self.heights, self.positions
+        return heights[marker] + step / float(positions[marker + 1] -
+                                              positions[marker - 1]) * \
+               ((positions[marker] - positions[marker - 1] + step) *
+                (heights[marker + 1] - heights[marker]) /
+                float(positions[marker + 1] - positions[marker]) +
+                (positions[marker + 1] - positions[marker] - step) *
+                (heights[marker] - heights[marker - 1]) /
+                float(positions[marker] - positions[marker - 1]))
+
+    # Class Function: Current estimate (exact while five values or fewer
+    # were added)
+    def value(self):
+        if not self.heights:
+            return None
+        if self.count <= 5:
+            rank = int(round(self.fraction * (len(self.heights) - 1)))
+            return self.heights[rank]
+        return self.heights[2]
+
+################################################################################
+# Class object: Count, mean, variance (Welford), minimum, maximum and
+# approximate quantiles of one numeric column
+class RunningStats(object):
+    __slots__ = ('count', 'mean', 'squares', 'minimum', 'maximum', 'quantiles')
+
+    # Initializer
+    def __init__(self, fractions):
+        self.count = 0
+        self.mean = 0.0
+        self.squares = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.quantiles = [P2Quantile(fraction) for fraction in fractions]
+
+    # Class Function: Add a value
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.squares += delta * (value - self.mean)
+        if self.minimum == None or value < self.minimum:
+            self.minimum = value
+        if self.maximum == None or value > self.maximum:
+            self.maximum = value
+        for quantile in self.quantiles:
+            quantile.add(value)
+
+    # Class Function: Sample variance
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self.squares / (self.count - 1)
+
+    # Class Function: Statistics as a JSON friendly dict
+    def summary(self):
+        summary = {'count': self.count,
+                   'mean': self.mean,
+                   'variance': self.variance(),
+                   'min': self.minimum,
+                   'max': self.maximum}
+        for quantile in self.quantiles:
+            summary['p%g' % (100 * quantile.fraction)] = quantile.value()
+        return summary
+
+################################################################################
+# Class object: Running statistics of the numeric columns of a run's results
+# Columns are named by the tool's results key; a result's values follow its
+# label column, as in the run log. Non-finite values are skipped.
+class ColumnStats(object):
+    # Initializer
+    def __init__(self, columnNames, fractions = (0.5, 0.9, 0.99)):
+        self.columnNames = columnNames
+        self.fractions = fractions
+
+        # Column index -> running statistics
+        self.columns = {}
+
+    # Class Function: Add the values of a result
+    def add(self, values, firstColumn = 1):
+        for columnIndex, value in enumerate(values, firstColumn):
+            # NaN and infinities give NaN, which is not equal to 0
+            if value - value != 0:
+                continue
+            stats = self.columns.get(columnIndex)
+            if stats == None:
+                stats = self.columns[columnIndex] = RunningStats(self.fractions)
+            stats.add(value)
+
+    # Class Function: Name of a column
+    def columnName(self, columnIndex):
+        if columnIndex < len(self.columnNames):
+            return self.columnNames[columnIndex]
+        return 'Column ' + str(columnIndex + 1)
+
+    # Class Function: Statistics of every column as a JSON friendly list
+    def summary(self):
+        summaries = []
+        for columnIndex in sorted(self.columns):
+            summary = self.columns[columnIndex].summary()
+            summary['column'] = self.columnName(columnIndex)
+            summaries.append(summary)
+        return summaries
+
+    # Class Function: One display line per column
+    def lines(self):
+        lines = []
+        for columnIndex in sorted(self.columns):
+            stats = self.columns[columnIndex]
+            lines.append('%s: n %d | mean %.4g sd %.4g | min %.4g max %.4g | %s'
+                         % (self.columnName(columnIndex),
+                            stats.count,
+                            stats.mean,
+                            math.sqrt(stats.variance()),
+                            stats.minimum,
+                            stats.maximum,
+                            ' '.join(['p%g %.4g' % (100 * quantile.fraction,
+                                                    quantile.value())
+                                      for quantile in stats.quantiles])))
+        return lines
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# Modules for completion manifest
+import os, time
+
+################################################################################
+# Function: Manifest key of an input path from its stat, stated here when
+# not given (None when it cannot be read)
+# Discovery computes the keys once and the run carries them with its tasks
+def inputKey(path, fileStat = None):
+    if fileStat == None:
+        try:
+            fileStat = os.stat(path)
+        except OSError:
+            return None
+    return (path, str(fileStat.st_size), str(int(fileStat.st_mtime)))
+
+################################################################################
+# Class object: Persistent record of the inputs a tool already completed
+# Each line holds path, size, mtime and tool version separated by tabs. An
+# input counts as done only while all four still match, so edited inputs
+# and new tool versions are processed again.
+class CompletionManifest(object):
+    # Initializer
+    def __init__(self, manifestPath, toolVersion, flushInterval = 2.0):
+        self.manifestPath = manifestPath
+        self.toolVersion = str(toolVersion)
+        self.flushInterval = flushInterval
+        self.lastFlush = time.time()
+        self.unflushed = False
+
+        # Load the inputs completed by earlier runs of this tool version
+        self.done = set()
+        if os.path.isfile(manifestPath):
+            with open(manifestPath) as manifestFile:
+                for line in manifestFile:
+                    columns = line.rstrip('\n').split('\t')
+                    if len(columns) == 4 and columns[3] == self.toolVersion:
+                        self.done.add(tuple(columns[:3]))
+
+        # Append this run's completions
+        self.manifestFile = open(manifestPath, 'a', 65536)
+
+    # Class Function: Check whether an input (by its key) was already
+    # completed
+    def isDone(self, inputKey):
+        return inputKey in self.done
+
+    # Class Function: Record a completed input by its key
+    def markDone(self, inputKey):
+        if inputKey == None or inputKey in self.done or self.manifestFile.closed:
+            return
+        self.done.add(inputKey)
+        self.manifestFile.write('\t'.join(inputKey + (self.toolVersion,)) + '\n')
+        self.unflushed = True
+        self.flushIfDue()
+
+    # Class Function: Flush periodically so a crash loses at most
+    # flushInterval seconds; called on every completion and on the engine's
+    # polls
+    def flushIfDue(self):
+        if self.unflushed and not self.manifestFile.closed and \
+           time.time() - self.lastFlush >= self.flushInterval:
+            self.manifestFile.flush()
+            self.lastFlush = time.time()
+            self.unflushed = False
+
+    # Class Function: Flush and close the manifest file
+    def close(self):
+        if not self.manifestFile.closed:
+            self.manifestFile.close()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# Modules for input discovery
+import os, Queue, threading
+
+# Use os.scandir (Python 3.5+) or the scandir backport when installed
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+# Function: Split a folder's entries into subfolders and files as (name,
+# directory entry) pairs (the entry is None without scandir)
+def _listFolder(folder):
+    subfolders, files = [], []
+    if scandir != None:
+        for entry in scandir(folder):
+            if entry.is_dir(follow_symlinks = False):
+                subfolders.append(entry.path)
+            else:
+                files.append((entry.name, entry))
+    else:
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if os.path.isdir(path) and not os.path.islink(path):
+                subfolders.append(path)
+            else:
+                files.append((name, None))
+    return subfolders, files
+
+# Function: Stat of a listed file, reusing its directory entry's (cached by
+# the listing on Windows); None when it cannot be read
+def _fileStat(path, entry):
+    try:
+        if entry != None:
+            return entry.stat()
+        return os.stat(path)
+    except OSError:
+        return None
+
+################################################################################
+# Function: Generator of lists of input paths found under inputFolder
+# Subfolders are listed in parallel by threadCount threads and each folder's
+# matching files are yielded as soon as it is listed, so processing can start
+# before the walk finishes. Unreadable folders are skipped like os.walk does.
+# With describe the walker threads also call describe(path, fileStat) for
+# every matching file (fileStat is None when it cannot be read) and the lists
+# hold (path, description) pairs.
+def iterInputBatches(inputFolder, allowedFormats, threadCount = 8,
+                     describe = None):
+    folders = Queue.Queue()
+    found = Queue.Queue()
+    stopEvent = threading.Event()
+    pending = [1]
+    pendingLock = threading.Lock()
+
+    # Function: Walker thread listing folders until told to stop
+    def walker():
+        for folder in iter(folders.get, None):
+            subfolders, matching = [], []
+            if not stopEvent.is_set():
+                try:
+                    subfolders, files = _listFolder(folder)
+                except OSError:
+                    files = []
+                matching = [os.path.join(folder, filename)
+                            for filename, entry in files
+                            if filename[-3:] in allowedFormats]
+                if describe != None:
+                    entries = [entry for filename, entry in files
+                               if filename[-3:] in allowedFormats]
+                    matching = [(path, describe(path, _fileStat(path, entry)))
+                                for path, entry in zip(matching, entries)]
+
+            # Queue the subfolders before this folder counts as done
+            with pendingLock:
+                pending[0] += len(subfolders) - 1
+                walkFinished = pending[0] == 0
+            for subfolder in subfolders:
+                folders.put(subfolder)
+
+            if matching:
+                found.put(matching)
+            if walkFinished:
+                found.put(None)
+
+    # Start the walker threads on the input folder
+    folders.put(inputFolder)
+    walkers = [threading.Thread(target = walker, name = 'InputWalker' + str(x))
+               for x in range(threadCount)]
+    for thread in walkers:
+        thread.daemon = True
+        thread.start()
+
+    # Yield batches until the walk finished, then stop the walkers
+    try:
+        for batch in iter(found.get, None):
+            yield batch
+    finally:
+        stopEvent.set()
+        for thread in walkers:
+            folders.put(None)
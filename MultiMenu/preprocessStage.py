@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# Modules for preprocess stage
+import cPickle, hashlib, inspect, multiprocessing, os, sys, time
+
+# Function: Fingerprint of the files under a folder from their relative
+# paths, sizes and modification times
+def folderFingerprint(folder):
+    digest = hashlib.sha1()
+    for root, folders, files in os.walk(folder):
+        folders.sort()
+        for fileName in sorted(files):
+            path = os.path.join(root, fileName)
+            try:
+                fileStat = os.stat(path)
+            except OSError:
+                continue
+            relativePath = os.path.relpath(path, folder)
+            if isinstance(relativePath, unicode):
+                relativePath = relativePath.encode('utf-8')
+            digest.update('%s\0%d\0%d\n' % (relativePath, fileStat.st_size,
+                                            int(fileStat.st_mtime)))
+    return digest.hexdigest()
+
+# Function: Preprocess process body
+# Sends ('progress', fraction, message) while working and ends with
+# ('done', value, cached) or ('error', message). Results are cached by tool
+# version, input folder fingerprint and output folder.
+def _preprocess(connection, moduleName, toolName, toolVersion, inputFolder,
+                outputFolder, cacheFolder, searchPaths):
+    # Make the tool folders importable when the process was spawned fresh
+    for searchPath in searchPaths:
+        if searchPath not in sys.path:
+            sys.path.append(searchPath)
+
+    # Function: Progress callback handed to tools that accept one
+    def progress(fraction = None, message = ''):
+        connection.send(('progress', fraction, message))
+
+    try:
+        # Reuse the result of an earlier run over the same inputs
+        progress(None, 'Checking inputs')
+        cacheKey = hashlib.sha1(repr((toolName,
+                                      toolVersion,
+                                      folderFingerprint(inputFolder),
+                                      os.path.abspath(outputFolder)))).hexdigest()
+        cachePath = os.path.join(cacheFolder, toolName + '_' + cacheKey + '.pickle')
+        if os.path.isfile(cachePath):
+            try:
+                with open(cachePath, 'rb') as cacheFile:
+                    connection.send(('done', cPickle.load(cacheFile), True))
+                return
+            except (IOError, EOFError, cPickle.UnpicklingError):
+                pass
+
+        # Preprocess, passing the progress callback to tools taking a third
+        # argument
+        progress(None, '')
+        preprocessFunction = getattr(__import__(moduleName), 'pre_' + toolName)
+        if len(inspect.getargspec(preprocessFunction).args) >= 3:
+            value = preprocessFunction(inputFolder, outputFolder, progress)
+        else:
+            value = preprocessFunction(inputFolder, outputFolder)
+
+        # Cache the result (written aside and renamed so a killed run never
+        # leaves a partial file behind)
+        try:
+            if not os.path.isdir(cacheFolder):
+                os.makedirs(cacheFolder)
+            with open(cachePath + '.partial', 'wb') as cacheFile:
+                cPickle.dump(value, cacheFile, cPickle.HIGHEST_PROTOCOL)
+            os.rename(cachePath + '.partial', cachePath)
+        except (IOError, OSError):
+            pass
+        connection.send(('done', value, False))
+    except Exception as error:
+        connection.send(('error', 'Raised ' + repr(error)))
+
+################################################################################
+# Class object: A run's preprocessing, running in its own process so the menu
+# stays responsive
+class PreprocessStage(object):
+    # Initializer
+    def __init__(self, moduleName, toolName, toolVersion, inputFolder,
+                 outputFolder, cacheFolder, searchPaths):
+        self.timeStarted = time.time()
+        self.fraction = None
+        self.message = ''
+        self.finished = False
+        self.cached = False
+        self.value = None
+        self.error = None
+
+        # Start the preprocess process
+        self.receiveConnection, sendConnection = multiprocessing.Pipe(False)
+        self.process = multiprocessing.Process(target = _preprocess,
+                                               name = 'Preprocess',
+                                               args = (sendConnection,
+                                                       moduleName,
+                                                       toolName,
+                                                       toolVersion,
+                                                       inputFolder,
+                                                       outputFolder,
+                                                       cacheFolder,
+                                                       list(searchPaths)))
+        self.process.daemon = True
+        self.process.start()
+        sendConnection.close()
+
+    # Class Function: Read the progress and outcome sent so far; returns
+    # whether the stage has finished
+    def poll(self):
+        while not self.finished and self.receiveConnection.poll():
+            try:
+                message = self.receiveConnection.recv()
+            except EOFError:
+                self.error = 'Preprocessing stopped unexpectedly'
+                self.finished = True
+                break
+            if message[0] == 'progress':
+                self.fraction, self.message = message[1:]
+            elif message[0] == 'done':
+                self.value, self.cached = message[1:]
+                self.finished = True
+            else:
+                self.error = message[1]
+                self.finished = True
+        if self.finished:
+            self.process.join(1)
+        return self.finished
+
+    # Class Function: Stop the preprocess process
+    def terminate(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(1)
+        self.finished = True
+
+    # Class Function: One line status text
+    def status(self):
+        if self.cached:
+            return 'Preprocessing: reused cached result'
+        if self.fraction != None:
+            text = 'Preprocessing: %d%%' % round(100 * self.fraction)
+        else:
+            text = 'Preprocessing: %ds' % (time.time() - self.timeStarted)
+        if self.message:
+            text += ' ' + self.message
+        return text
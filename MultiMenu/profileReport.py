@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+# Modules for profile report
+import os, pstats
+
+################################################################################
+# Function: Merge per-worker profiles into one hot-spot report
+# Writes reportBase.prof (the merged profile, readable by pstats and profile
+# viewers) and reportBase.profile.txt listing the limit hottest functions by
+# own time and by cumulative time. The per-worker files are removed.
+# Returns the text report's path.
+def mergeProfiles(profilePaths, reportBase, limit = 40):
+    profileStats = pstats.Stats(profilePaths[0])
+    for profilePath in profilePaths[1:]:
+        profileStats.add(profilePath)
+    profileStats.dump_stats(reportBase + '.prof')
+
+    # Write the hottest functions across all workers
+    reportPath = reportBase + '.profile.txt'
+    with open(reportPath, 'w') as reportFile:
+        reportFile.write('Merged profile of ' + str(len(profilePaths)) +
+                         ' worker(s)\n\n')
+        profileStats.stream = reportFile
+        profileStats.sort_stats('tottime').print_stats(limit)
+        profileStats.sort_stats('cumulative').print_stats(limit)
+
+    # Remove the per-worker profiles
+    for profilePath in profilePaths:
+        os.remove(profilePath)
+    return reportPath
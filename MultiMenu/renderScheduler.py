@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+# Modules for render scheduler
+import collections, time
+
+################################################################################
+# Class object: Coalesced widget redraws at a capped frame rate
+# Widgets are marked dirty with the callback that renders them; a frame runs
+# every marked callback once (a widget marked again before its frame is still
+# rendered once) and then lets Tk redraw with a single update_idletasks.
+# Frames are at least 1 / maxFrameRate seconds apart, so the rendering cost
+# follows the frame rate rather than how often the shown state changes.
+class RenderScheduler(object):
+    # Initializer
+    def __init__(self, root, maxFrameRate = 30):
+        self.root = root
+        self.frameInterval = 1.0 / maxFrameRate
+
+        # Dirty widget key -> render callback, in marking order
+        self.dirty = collections.OrderedDict()
+
+        # Scheduled frame (after id) and start of the last frame
+        self.frameAfterId = None
+        self.lastFrame = 0.0
+
+    # Class Function: Render a widget in the next frame
+    def mark(self, key, render):
+        self.dirty[key] = render
+        if self.frameAfterId == None:
+            delay = self.lastFrame + self.frameInterval - time.time()
+            self.frameAfterId = self.root.after(max(0, int(1000 * delay)),
+                                                self._frame)
+
+    # Class Function: Render the dirty widgets now
+    def flush(self):
+        if self.frameAfterId != None:
+            self.root.after_cancel(self.frameAfterId)
+        self._frame()
+
+    # Class Function: Render every dirty widget and redraw once
+    def _frame(self):
+        self.frameAfterId = None
+        self.lastFrame = time.time()
+        dirty, self.dirty = self.dirty, collections.OrderedDict()
+        for render in dirty.values():
+            render()
+        self.root.update_idletasks()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+# Modules for result channel
+import collections, multiprocessing, threading, time
+
+################################################################################
+# Class object: One way pipe shared by many writer processes
+# put() writes synchronously under writeLock (there is no feeder thread), so a
+# process holding writeLock knows no writer is in the middle of a message and
+# can safely terminate one of them
+class LockedPipe(object):
+    # Initializer
+    def __init__(self):
+        self.receiveConnection, self.sendConnection = multiprocessing.Pipe(False)
+        self.writeLock = multiprocessing.Lock()
+
+    # Class Function: Send an object
+    def put(self, item):
+        with self.writeLock:
+            self.sendConnection.send(item)
+
+    # Class Function: Receive an object (single reader), blocking up to
+    # timeout seconds when a timeout is given
+    def get(self, timeout = None):
+        if timeout != None and not self.receiveConnection.poll(timeout):
+            return None
+        return self.receiveConnection.recv()
+
+    # Class Function: Wait up to timeout seconds for an object; returns whether
+    # one is waiting
+    def wait(self, timeout):
+        return self.receiveConnection.poll(timeout)
+
+    # Class Function: Check whether an object is waiting
+    def empty(self):
+        return not self.receiveConnection.poll()
+
+################################################################################
+# Class object: Result transport from the workers to the menu
+# Workers write through a direct pipe (no Manager server hop) and send packed
+# records in batches; the menu drains whole batches at once
+# With startReader a reader thread moves arriving batches off the pipe, so
+# writers never wait on a full pipe while the menu is busy, and wakes the
+# menu through a notify callback instead of the menu polling the pipe
+class ResultChannel(object):
+    # Initializer
+    def __init__(self, batchSize = 256, flushInterval = 0.05,
+                 maxQueuedBatches = 1024):
+        self.pipe = LockedPipe()
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+
+        # Batches read by the reader thread, which stops reading (leaving
+        # the writers to wait on the pipe) past maxQueuedBatches
+        self.maxQueuedBatches = maxQueuedBatches
+        self.batches = None
+        self.batchesChanged = threading.Condition()
+
+        # Whether the menu was notified and has not acknowledged it since
+        self.notifyPending = False
+
+    # Class Function: State pickled for worker processes (spawned on Windows);
+    # the reader thread's batches and condition stay in the menu process
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['batches'] = None
+        state['batchesChanged'] = None
+        state['notifyPending'] = False
+        return state
+
+    # Class Function: Queue-like writer used inside a worker process
+    def writer(self):
+        return ChannelWriter(self.pipe, self.batchSize, self.flushInterval)
+
+    # Class Function: Start the reader thread; notify is called from that
+    # thread when batches arrive, once until the menu acknowledges it
+    def startReader(self, notify):
+        self.batches = collections.deque()
+
+        # Function: Reader thread loop
+        def reader():
+            while True:
+                try:
+                    batch = self.pipe.get()
+                except (EOFError, IOError):
+                    break
+                with self.batchesChanged:
+                    while len(self.batches) >= self.maxQueuedBatches:
+                        self.batchesChanged.wait()
+                    self.batches.append(batch)
+                    self.batchesChanged.notify_all()
+                    notifyNow = not self.notifyPending
+                    self.notifyPending = True
+                if notifyNow:
+                    notify()
+
+        readerThread = threading.Thread(target = reader,
+                                        name = 'ChannelReader')
+        readerThread.daemon = True
+        readerThread.start()
+
+    # Class Function: Let batches arriving from now on notify the menu again
+    def acknowledge(self):
+        with self.batchesChanged:
+            self.notifyPending = False
+
+    # Class Function: Check whether a batch is waiting
+    def empty(self):
+        if self.batches != None:
+            return not self.batches
+        return self.pipe.empty()
+
+    # Class Function: Pull every waiting record, up to maxBatches batches
+    # With a timeout the first batch is waited for up to timeout seconds
+    def drain(self, maxBatches = None, timeout = None):
+        if self.batches != None:
+            return self._drainQueued(maxBatches, timeout)
+        records = []
+        batches = 0
+        while maxBatches == None or batches < maxBatches:
+            if timeout != None and batches == 0:
+                batch = self.pipe.get(timeout)
+            elif self.pipe.empty():
+                batch = None
+            else:
+                batch = self.pipe.get()
+            if batch == None:
+                break
+            records.extend(batch)
+            batches += 1
+        return records
+
+    # Class Function: drain() from the reader thread's batches
+    def _drainQueued(self, maxBatches, timeout):
+        records = []
+        with self.batchesChanged:
+            if timeout != None and not self.batches:
+                self.batchesChanged.wait(timeout)
+            while self.batches and (maxBatches == None or maxBatches > 0):
+                records.extend(self.batches.popleft())
+                if maxBatches != None:
+                    maxBatches -= 1
+            self.batchesChanged.notify_all()
+        return records
+
+################################################################################
+# Class object: Worker side of the result channel
+class ChannelWriter(object):
+    # Initializer
+    def __init__(self, pipe, batchSize, flushInterval):
+        self.pipe = pipe
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.buffer = []
+        self.bufferStarted = 0.0
+        self.bufferLock = threading.Lock()
+
+    # Class Function: Buffer a packed record and send the batch when full/old
+    def put(self, packedRecord):
+        with self.bufferLock:
+            if not self.buffer:
+                self.bufferStarted = time.time()
+            self.buffer.append(packedRecord)
+            if len(self.buffer) >= self.batchSize or \
+               time.time() - self.bufferStarted >= self.flushInterval:
+                self._send()
+
+    # Class Function: Send the buffered records
+    def flush(self):
+        with self.bufferLock:
+            self._send()
+
+    # Class Function: Flush from a background thread every flushInterval so
+    # records of a long running task reach the menu without waiting for the
+    # next put or the end of the task
+    def startFlusher(self):
+        # Function: Flusher thread loop
+        def flusher():
+            while True:
+                time.sleep(self.flushInterval)
+                self.flush()
+
+        flusherThread = threading.Thread(target = flusher,
+                                         name = 'ChannelFlusher')
+        flusherThread.daemon = True
+        flusherThread.start()
+
+    # Class Function: Send the buffer (bufferLock must be held)
+    def _send(self):
+        if self.buffer:
+            self.pipe.put(self.buffer)
+            self.buffer = []
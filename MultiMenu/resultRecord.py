@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+# Modules for result records
+import struct
+from array import array
+
+# Record statuses
+RESULT = 0
+ERROR = 1
+
+# Task timing sent by the worker after each task or block: values are
+# queued, started and ended times, worker id, input size in bytes and the
+# number of items processed
+TIMING = 2
+
+# Worker profile saved at the end of a job: the label is the profile's path
+PROFILE = 3
+
+# Block of result or error rows sent by batch tools in one message
+BLOCK = 4
+
+# Retryable error: the task is queued again and its final result or error
+# arrives later
+RETRY = 5
+
+# End of a job, sent by the pool once the job's last task finished: every
+# record the job's tasks sent arrives before it
+JOB_END = 6
+
+# Record header: tool id, task id, status, value count, label length
+# Followed by the numeric values (doubles), the label and the message
+_header = struct.Struct('<IIBBH')
+
+# Block header: tool id, unused, BLOCK, row status, shared message flag, row
+# count, column count, labels length. Followed by the task ids (unsigned
+# ints), the row-major values (doubles), the newline separated labels and the
+# shared message or newline separated messages
+_blockHeader = struct.Struct('<IIBBBIII')
+
+################################################################################
+# Class object: Typed result record sent from the workers to the menu
+class ResultRecord(object):
+    __slots__ = ('toolId', 'taskId', 'status', 'label', 'values', 'message')
+
+    # Initializer
+    def __init__(self, toolId, taskId, status, label = '', values = (),
+                 message = ''):
+        self.toolId = toolId
+        self.taskId = taskId
+        self.status = status
+        self.label = label
+        self.values = tuple(values)
+        self.message = message
+
+    # Class Function: Serialize the record into its compact binary form
+    def pack(self):
+        label = _encode(self.label)
+        return _header.pack(self.toolId,
+                            self.taskId,
+                            self.status,
+                            len(self.values),
+                            len(label))\
+               + struct.pack('<%dd' % len(self.values), *self.values)\
+               + label + _encode(self.message)
+
+    # Class Function: Display columns in results key order
+    def fields(self):
+        return formatFields(self.label, self.values, self.message)
+
+# Function: Display columns for a label, numeric values and message
+def formatFields(label, values, message):
+    fields = [label] if label else []
+    fields.extend([str(value) for value in values])
+    if message:
+        fields.extend(message.split('\t'))
+    return fields
+
+# Function: Deserialize a record packed by ResultRecord.pack
+def unpack(data):
+    toolId, taskId, status, valueCount, labelLength = \
+            _header.unpack_from(data)
+    offset = _header.size + 8 * valueCount
+    values = struct.unpack_from('<%dd' % valueCount, data, _header.size)
+    return ResultRecord(toolId,
+                        taskId,
+                        status,
+                        data[offset:offset + labelLength],
+                        values,
+                        data[offset + labelLength:])
+
+# Function: Records of a packed record or block
+def unpackRecords(data):
+    if ord(data[8]) == BLOCK:
+        return unpackBlock(data)
+    return (unpack(data),)
+
+# Function: Serialize rows of one status into a block record
+# taskIds, labels and values may be NumPy arrays or sequences (values as
+# rows of numbers); messages is one message shared by every row or a
+# sequence of row messages
+def packBlock(toolId, status, taskIds, labels, values, messages):
+    rowCount = len(taskIds)
+    if hasattr(taskIds, 'astype'):
+        taskIdBytes = taskIds.astype('<u4').tostring()
+    else:
+        taskIdBytes = array('I', [int(x) for x in taskIds]).tostring()
+
+    # Values of NumPy arrays are packed without a Python loop
+    if hasattr(values, 'astype'):
+        columnCount = values.shape[1] if len(values.shape) > 1 else 1
+        valueBytes = values.astype('<f8').tostring()
+    else:
+        values = list(values)
+        columnCount = len(values[0]) if values else 0
+        valueBytes = array('d', [x for row in values for x in row]).tostring()
+    if rowCount == 0:
+        columnCount = 0
+
+    labelBytes = _encode('\n'.join(labels))
+    sharedMessage = isinstance(messages, basestring)
+    if not sharedMessage:
+        messages = '\n'.join(messages)
+    return _blockHeader.pack(toolId, 0, BLOCK, status, sharedMessage,
+                             rowCount, columnCount, len(labelBytes))\
+           + taskIdBytes + valueBytes + labelBytes + _encode(messages)
+
+# Function: Deserialize a block packed by packBlock into its row records
+def unpackBlock(data):
+    toolId, unused, blockStatus, status, sharedMessage, rowCount,\
+            columnCount, labelLength = _blockHeader.unpack_from(data)
+    offset = _blockHeader.size
+    taskIds = array('I')
+    taskIds.fromstring(data[offset:offset + 4 * rowCount])
+    offset += 4 * rowCount
+    values = array('d')
+    values.fromstring(data[offset:offset + 8 * rowCount * columnCount])
+    offset += 8 * rowCount * columnCount
+    labels = data[offset:offset + labelLength].split('\n')
+    message = data[offset + labelLength:]
+    if sharedMessage:
+        messages = [message] * rowCount
+    else:
+        messages = message.split('\n')
+    return [ResultRecord(toolId,
+                         taskIds[row],
+                         status,
+                         labels[row],
+                         values[row * columnCount:(row + 1) * columnCount],
+                         messages[row])
+            for row in xrange(rowCount)]
+
+# Function: Adapter for the legacy '<tool>[Error: ]col\tcol...' strings
+# The first column becomes the label, the numeric columns that follow become
+# values and anything left over is kept as the tab separated message
+def fromLegacyString(toolName, resultString, toolId = 0, taskId = 0):
+    if resultString.startswith(toolName):
+        resultString = resultString[len(toolName):]
+    columns = resultString.split('\t')
+
+    # Legacy errors are not split into typed columns
+    if 'Error: ' in resultString:
+        return ResultRecord(toolId, taskId, ERROR, columns[0], (),
+                            '\t'.join(columns[1:]))
+
+    # Collect the numeric columns following the label
+    values = []
+    for column in columns[1:]:
+        try:
+            values.append(float(column))
+        except ValueError:
+            break
+    return ResultRecord(toolId, taskId, RESULT, columns[0], values,
+                        '\t'.join(columns[1 + len(values):]))
+
+# Function: Encode unicode text for packing
+def _encode(text):
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return text
+
+################################################################################
+# Class object: Queue-like writer handed to tools in place of the raw queue
+# put() accepts the legacy string protocol; result() and error() send typed
+# records directly and resultBlock() and errorBlock() send the rows of a
+# batch tool's block in one message.
+# Errors marked retryable are sent as RETRY records for the tasks in
+# retryIds (tasks with retries left) and as final errors otherwise.
+class RecordQueue(object):
+    __slots__ = ('queue', 'toolId', 'toolName', 'taskId', 'taskIds',
+                 'reportedIds', 'retryIds', 'retriedIds')
+
+    # Initializer
+    def __init__(self, queue, toolId, toolName):
+        self.queue = queue
+        self.toolId = toolId
+        self.toolName = toolName
+        self.taskId = 0
+
+        # Task ids of the current block and the ones given rows so far
+        self.taskIds = []
+        self.reportedIds = set()
+
+        # Task ids that may still be retried and the ones sent as retries
+        self.retryIds = set()
+        self.retriedIds = set()
+
+    # Class Function: Legacy string protocol
+    def put(self, resultString):
+        self.queue.put(fromLegacyString(self.toolName,
+                                        resultString,
+                                        self.toolId,
+                                        self.taskId).pack())
+
+    # Class Function: Send a result record
+    def result(self, label, values = (), message = ''):
+        self.queue.put(ResultRecord(self.toolId, self.taskId, RESULT, label,
+                                    values, message).pack())
+
+    # Class Function: Send an error record
+    def error(self, label, message = '', retryable = False):
+        status = ERROR
+        if retryable and self.taskId in self.retryIds:
+            status = RETRY
+            self.retriedIds.add(self.taskId)
+        self.queue.put(ResultRecord(self.toolId, self.taskId, status, label,
+                                    (), message).pack())
+
+    # Class Function: Send result rows; taskIds defaults to the whole block
+    def resultBlock(self, labels, values = (), messages = '', taskIds = None):
+        self._block(RESULT, labels, values, messages, taskIds)
+
+    # Class Function: Send error rows; taskIds defaults to the whole block
+    # Retryable rows of tasks with retries left are sent as a RETRY block
+    def errorBlock(self, labels, messages = '', taskIds = None,
+                   retryable = False):
+        if taskIds is None:
+            taskIds = self.taskIds
+        if not retryable:
+            self._block(ERROR, labels, (), messages, taskIds)
+            return
+
+        # Split the rows into retries and final errors
+        for status, rows in ((RETRY, [row for row, taskId in enumerate(taskIds)
+                                      if taskId in self.retryIds]),
+                             (ERROR, [row for row, taskId in enumerate(taskIds)
+                                      if taskId not in self.retryIds])):
+            if rows:
+                rowTaskIds = [taskIds[row] for row in rows]
+                if status == RETRY:
+                    self.retriedIds.update(rowTaskIds)
+                self._block(status,
+                            [labels[row] for row in rows],
+                            (),
+                            messages if isinstance(messages, basestring)
+                            else [messages[row] for row in rows],
+                            rowTaskIds)
+
+    # Class Function: Pack and send a block of rows
+    def _block(self, status, labels, values, messages, taskIds):
+        # Arrays cannot be compared to None with ==
+        if taskIds is None:
+            taskIds = self.taskIds
+        self.reportedIds.update(taskIds)
+        self.queue.put(packBlock(self.toolId, status, taskIds, labels, values,
+                                 messages))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+# Modules for result store
+import array, resultRecord
+
+################################################################################
+# Class object: Compact columnar store of the result records of one list
+# Numeric columns live in typed arrays and text columns are interned, so a
+# row costs a few machine words instead of a formatted display string
+class ResultStore(object):
+    # Initializer
+    def __init__(self):
+        self.clear()
+
+    # Class Function: Remove every row
+    def clear(self):
+        self.taskIds = array.array('L')
+        self.labelIds = array.array('L')
+        self.messageIds = array.array('L')
+        self.values = array.array('d')
+        self.valueOffsets = array.array('L', [0])
+        self.strings = []
+        self.stringIds = {}
+
+    # Class Function: Number of rows
+    def __len__(self):
+        return len(self.taskIds)
+
+    # Class Function: Append a result record as a row
+    def append(self, record):
+        self.taskIds.append(record.taskId)
+        self.labelIds.append(self._intern(record.label))
+        self.messageIds.append(self._intern(record.message))
+        self.values.extend(record.values)
+        self.valueOffsets.append(len(self.values))
+
+    # Class Function: Display columns of a row
+    def fields(self, index):
+        return resultRecord.formatFields(
+            self.strings[self.labelIds[index]],
+            self.values[self.valueOffsets[index]:self.valueOffsets[index + 1]],
+            self.strings[self.messageIds[index]])
+
+    # Class Function: Numbered display strings of rows start to stop
+    def rows(self, start, stop):
+        return [str(index + 1) + ': ' + ' | '.join(self.fields(index))
+                for index in xrange(start, min(stop, len(self)))]
+
+    # Class Function: Share one copy of repeated text
+    def _intern(self, text):
+        stringId = self.stringIds.get(text)
+        if stringId == None:
+            stringId = self.stringIds[text] = len(self.strings)
+            self.strings.append(text)
+        return stringId
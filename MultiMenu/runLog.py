@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+# Modules for run log
+import json, resultRecord, time
+
+################################################################################
+# Class object: Append-only JSON lines log streamed while a run is processing
+# Line one is a header with the results and errors keys, every result, error
+# or retried error is a line whose columns are named by those keys, every
+# finished task adds a timing line and the footer with the run's metrics and
+# result column statistics is written when the run is finalized
+class RunLog(object):
+    # Initializer
+    def __init__(self, logFilePath, toolName, resultsKey, errorsKey,
+                 flushInterval = 2.0, bufferSize = 65536):
+        self.logFilePath = logFilePath
+        self.resultsColumns = resultsKey.split(' | ')
+        self.errorsColumns = errorsKey.split(' | ')
+        self.flushInterval = flushInterval
+        self.lastFlush = time.time()
+        self.unflushed = False
+        self.logFile = open(logFilePath, 'w', bufferSize)
+        self._writeLine({'kind': 'header',
+                         'tool': toolName,
+                         'timeStarted': time.ctime(),
+                         'resultsKey': self.resultsColumns,
+                         'errorsKey': self.errorsColumns})
+
+    # Class Function: Check whether the log was finalized
+    def closed(self):
+        return self.logFile.closed
+
+    # Class Function: Append a result or error record with its display number
+    def write(self, record, count):
+        if self.logFile.closed:
+            return
+        if record.status == resultRecord.ERROR:
+            kind, columns = 'error', self.errorsColumns
+        elif record.status == resultRecord.RETRY:
+            kind, columns = 'retry', self.errorsColumns
+        else:
+            kind, columns = 'result', self.resultsColumns
+
+        # Name the record's fields by the key columns
+        fields = [record.label] if record.label else []
+        fields.extend(record.values)
+        if record.message:
+            fields.extend(record.message.split('\t'))
+        line = dict(zip(columns, fields))
+        if len(fields) > len(columns):
+            line['extra'] = fields[len(columns):]
+        line.update({'kind': kind, 'count': count, 'task': record.taskId})
+        self._writeLine(line)
+        self.flushIfDue()
+
+    # Class Function: Append a task timing record
+    def writeTiming(self, record):
+        if self.logFile.closed:
+            return
+        queued, started, ended, workerId, inputSize, itemCount = record.values
+        self._writeLine({'kind': 'timing',
+                         'task': record.taskId,
+                         'items': int(itemCount),
+                         'wait': started - queued,
+                         'started': started,
+                         'seconds': ended - started,
+                         'worker': int(workerId),
+                         'bytes': int(inputSize)})
+        self.flushIfDue()
+
+    # Class Function: Push buffered lines to the file
+    def flush(self):
+        if not self.logFile.closed:
+            self.logFile.flush()
+            self.lastFlush = time.time()
+            self.unflushed = False
+
+    # Class Function: Flush periodically so a crash loses at most
+    # flushInterval seconds; called on every write and on the engine's polls
+    # so lines written before a quiet spell still reach the file
+    def flushIfDue(self):
+        if self.unflushed and \
+           time.time() - self.lastFlush >= self.flushInterval:
+            self.flush()
+
+    # Class Function: Write the footer and close the file
+    def close(self, status, progressCount, errorCount, metrics = None,
+              retryCount = 0, columns = None):
+        if self.logFile.closed:
+            return
+        self._writeLine({'kind': 'footer',
+                         'status': status,
+                         'timeEnded': time.ctime(),
+                         'results': progressCount,
+                         'errors': errorCount,
+                         'retries': retryCount,
+                         'metrics': metrics,
+                         'columns': columns})
+        self.logFile.close()
+
+    # Class Function: Write one JSON line
+    def _writeLine(self, line):
+        self.logFile.write(json.dumps(line) + '\n')
+        self.unflushed = True
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+# Modules for task cost
+import json, os, re, struct
+
+# Bytes read from the start of an input to find its image dimensions: a
+# prefix first and up to headerBytes only for formats whose dimensions were
+# not in the prefix
+prefixBytes = 4096
+headerBytes = 65536
+
+# Runs fit the cost model only after this many timed tasks
+minSamples = 20
+
+# Function: Image width and height of a JPEG from its first frame header
+# (segments past the header bytes are skipped by seeking in the file)
+def _jpegDimensions(header, inputFile):
+    offset = 2
+    while True:
+        if offset + 9 <= len(header):
+            segment = header[offset:offset + 9]
+        else:
+            inputFile.seek(offset)
+            segment = inputFile.read(9)
+            if len(segment) < 9:
+                return None
+        if segment[0] != '\xff':
+            return None
+        marker = ord(segment[1])
+        if marker == 0xff:
+            offset += 1
+            continue
+        length = struct.unpack_from('>H', segment, 2)[0]
+
+        # Start of frame markers, leaving out DHT, JPG and DAC
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            height, width = struct.unpack_from('>HH', segment, 5)
+            return width, height
+        offset += 2 + length
+
+# Function: Image width and height of a TIFF from its first directory (the
+# directory is read from the file when it is past the header bytes)
+def _tiffDimensions(header, inputFile):
+    order = '<' if header[:2] == 'II' else '>'
+    directoryOffset = struct.unpack_from(order + 'I', header, 4)[0]
+    if directoryOffset + 2 <= len(header):
+        directory = header[directoryOffset:]
+    else:
+        inputFile.seek(directoryOffset)
+        directory = inputFile.read(2 + 12 * 64)
+    entryCount = struct.unpack_from(order + 'H', directory)[0]
+    dimensions = {}
+    for entryOffset in xrange(2, min(2 + 12 * entryCount, len(directory) - 11), 12):
+        tag, fieldType = struct.unpack_from(order + 'HH', directory, entryOffset)
+        if tag in (256, 257):
+            valueFormat = order + ('H' if fieldType == 3 else 'I')
+            dimensions[tag] = struct.unpack_from(valueFormat, directory,
+                                                 entryOffset + 8)[0]
+    if len(dimensions) == 2:
+        return dimensions[256], dimensions[257]
+    return None
+
+# Function: Image width and height of a JPEG 2000 file or codestream
+def _jpeg2000Dimensions(header):
+    # JP2 image header box
+    boxOffset = header.find('ihdr')
+    if boxOffset >= 0 and boxOffset + 12 <= len(header):
+        height, width = struct.unpack_from('>II', header, boxOffset + 4)
+        return width, height
+
+    # Codestream image and tile size marker segment
+    if header[:4] == '\xff\x4f\xff\x51' and len(header) >= 24:
+        width, height, offsetX, offsetY = struct.unpack_from('>IIII', header, 8)
+        return width - offsetX, height - offsetY
+    return None
+
+# Function: Image width and height of a BSB/KAP chart from its text header
+def _kapDimensions(header):
+    match = re.search(r'RA\s*=\s*(\d+)\s*,\s*(\d+)', header.split('\x1a')[0])
+    if match != None:
+        return int(match.group(1)), int(match.group(2))
+    return None
+
+# Function: Image width and height of an IFF ILBM from its bitmap header
+def _iffDimensions(header):
+    chunkOffset = header.find('BMHD')
+    if chunkOffset >= 0 and chunkOffset + 12 <= len(header):
+        return struct.unpack_from('>HH', header, chunkOffset + 8)
+    return None
+
+# Function: Parser of the header formats read as a whole (JPEG 2000, IFF and
+# KAP), None for other formats
+def _headerParser(path, header):
+    if header[4:8] == 'jP  ' or header[:4] == '\xff\x4f\xff\x51':
+        return _jpeg2000Dimensions
+    if header[:4] == 'FORM':
+        return _iffDimensions
+    if path[-3:].lower() == 'kap':
+        return _kapDimensions
+    return None
+
+################################################################################
+# Function: Image width and height read from an input's header bytes, None
+# for unknown or unreadable formats
+def imageDimensions(path):
+    try:
+        with open(path, 'rb') as inputFile:
+            header = inputFile.read(prefixBytes)
+            if header[:2] == '\xff\xd8':
+                return _jpegDimensions(header, inputFile)
+            if header[:4] in ('II*\0', 'MM\0*'):
+                return _tiffDimensions(header, inputFile)
+            parser = _headerParser(path, header)
+            if parser == None:
+                return None
+            dimensions = parser(header)
+            if dimensions == None and len(header) == prefixBytes:
+                dimensions = parser(header +
+                                    inputFile.read(headerBytes - prefixBytes))
+            return dimensions
+    except (IOError, OSError, struct.error):
+        return None
+
+# Function: Cost features of an input: file size in megabytes and image size
+# in megapixels (0 when the dimensions are not known); the input is stated
+# when its stat is not given
+def inputFeatures(path, fileStat = None):
+    if fileStat == None:
+        try:
+            fileStat = os.stat(path)
+        except OSError:
+            return (0.0, 0.0)
+    dimensions = imageDimensions(path)
+    pixels = dimensions[0] * dimensions[1] if dimensions != None else 0
+    return (fileStat.st_size / 1e6, pixels / 1e6)
+
+# Function: Solve a small linear system with Gaussian elimination (partial
+# pivoting); None when it is singular
+def _solve(matrix, vector):
+    size = len(vector)
+    rows = [list(matrix[row]) + [vector[row]] for row in xrange(size)]
+    for column in xrange(size):
+        pivot = max(xrange(column, size), key = lambda row: abs(rows[row][column]))
+        if abs(rows[pivot][column]) < 1e-12:
+            return None
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for row in xrange(column + 1, size):
+            factor = rows[row][column] / rows[column][column]
+            for x in xrange(column, size + 1):
+                rows[row][x] -= factor * rows[column][x]
+    solution = [0.0] * size
+    for row in reversed(xrange(size)):
+        solution[row] = (rows[row][size] - sum([rows[row][x] * solution[x]
+                                                for x in xrange(row + 1, size)])) \
+                        / rows[row][row]
+    return solution
+
+################################################################################
+# Class object: Linear model of a tool's seconds per task from the input's
+# size and pixel count, fitted by least squares over the timed tasks of its
+# earlier runs. Only the normal equation sums are kept (and saved next to
+# the logs), each run that timed tasks halving the weight of the runs before
+# it when its sums are merged.
+class CostModel(object):
+    # Initializer
+    def __init__(self, modelPath, decay = 0.5):
+        self.modelPath = modelPath
+        self.decay = decay
+        self.count = 0.0
+        self.squares = [[0.0] * 3 for x in xrange(3)]
+        self.products = [0.0] * 3
+        try:
+            with open(modelPath) as modelFile:
+                model = json.load(modelFile)
+            self.count = model['count']
+            self.squares = model['squares']
+            self.products = model['products']
+        except (IOError, ValueError, KeyError):
+            pass
+
+        # Sums of this run's timed tasks, merged by save()
+        self.runCount = 0
+        self.runSquares = [[0.0] * 3 for x in xrange(3)]
+        self.runProducts = [0.0] * 3
+
+        # Coefficients fitted on the earlier runs; fixed for this run so all
+        # of its tasks are ranked by the same estimate
+        self.coefficients = self._fit()
+
+    # Class Function: Add a timed task
+    def add(self, features, seconds):
+        terms = (1.0,) + tuple(features)
+        self.runCount += 1
+        for row in xrange(3):
+            self.runProducts[row] += terms[row] * seconds
+            for column in xrange(3):
+                self.runSquares[row][column] += terms[row] * terms[column]
+
+    # Class Function: Estimated cost of an input; its size in megabytes until
+    # earlier runs timed enough tasks
+    def cost(self, features):
+        if self.coefficients == None:
+            return features[0]
+        return max(0.0, self.coefficients[0] +
+                        self.coefficients[1] * features[0] +
+                        self.coefficients[2] * features[1])
+
+    # Class Function: Least squares coefficients (slightly regularized so
+    # inputs without dimensions do not make the system singular)
+    def _fit(self):
+        if self.count < minSamples:
+            return None
+        ridge = 1e-6 * (sum([self.squares[x][x] for x in xrange(3)]) or 1.0)
+        matrix = [[self.squares[row][column] + (ridge if row == column else 0.0)
+                   for column in xrange(3)] for row in xrange(3)]
+        return _solve(matrix, self.products)
+
+    # Class Function: Merge this run's sums into the earlier runs' and save
+    # them for later runs; nothing is saved when the run timed no task since
+    # the last save
+    def save(self):
+        if self.runCount == 0:
+            return
+        decay = self.decay
+        self.count = self.count * decay + self.runCount
+        self.squares = [[self.squares[row][column] * decay +
+                         self.runSquares[row][column] for column in xrange(3)]
+                        for row in xrange(3)]
+        self.products = [self.products[row] * decay + self.runProducts[row]
+                         for row in xrange(3)]
+        self.runCount = 0
+        self.runSquares = [[0.0] * 3 for x in xrange(3)]
+        self.runProducts = [0.0] * 3
+        try:
+            with open(self.modelPath, 'w') as modelFile:
+                json.dump({'count': self.count,
+                           'squares': self.squares,
+                           'products': self.products}, modelFile)
+        except IOError:
+            pass
@@ -0,0 +1,619 @@
+# -*- coding: utf-8 -*-
+
+# Modules for task engine
+import argparse, collections, columnStats, completionManifest, inputDiscovery,\
+       multiprocessing, os, preprocessStage, profileReport, resultChannel,\
+       resultRecord, resultStore, runLog, sys, taskCost, taskMetrics,\
+       threading, time, toolRegistry, workerPool
+
+# Tools and logs folders next to the engine
+toolsFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Tools")
+logsFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Logs")
+
+# Append tools folder to system path for access to the tool modules
+sys.path.append(toolsFolder)
+
+# Image types allowed
+allowedImageFormats = ['kap','jp2','jpg','tif','iff']
+
+# Rows of a block record added between two checks of a poll's time budget
+budgetCheckRows = 64
+
+# Keys of tools whose keys cannot be read because they fail to import (their
+# runs fail in the workers)
+fallbackResultsKey = 'Task | Result'
+fallbackErrorsKey = 'Task | Error Message'
+
+# Function: Test tools ("task" keyword) run on generated task numbers
+def isTestTool(toolName):
+    return 'task' in toolName
+
+################################################################################
+# Class object: State of one tool run
+class EngineRun(object):
+    # Initializer
+    def __init__(self, toolName, taskCount, resultsKey, errorsKey,
+                 logFilePath, keepResults):
+        self.toolName = toolName
+        self.jobId = None
+        self.taskCount = taskCount
+        self.discoveryDone = True
+        self.skippedCount = 0
+
+        # Completion manifest keys of the discovered inputs by task id and the
+        # manifest that lets a later run skip them (only kept for discovered
+        # inputs of runs writing outputs)
+        self.taskKeys = []
+        self.manifest = None
+
+        # Cost features of the discovered inputs by task id and the tool's
+        # cost model learning from their timings
+        self.taskFeatures = []
+        self.costModel = None
+
+        # Background preprocessing of tools that need it
+        self.preprocess = None
+        self.resultsKey = resultsKey
+        self.errorsKey = errorsKey
+        self.progressCount = 0
+        self.errorCount = 0
+
+        # Retryable errors of tasks that were queued again (not completed)
+        self.retryCount = 0
+        self.status = 'running'
+        self.killDeadline = None
+
+        # Whether the pool's end of job record arrived: the job's tasks are
+        # done and all of their records were added
+        self.jobEnded = False
+
+        # Whether the engine is done with the run (its profile report, if
+        # any, was merged)
+        self.retired = False
+
+        # Why a failed run failed (its preprocessing or its tool raised)
+        self.error = None
+        self.timeStarted = time.ctime()
+        self.timeEnded = None
+
+        # Per-task timings reported by the workers
+        self.metrics = taskMetrics.TaskMetrics()
+
+        # Running statistics of the numeric result columns
+        self.columnStats = columnStats.ColumnStats(resultsKey.split(' | '))
+
+        # Profiling (off unless profileBase is set): workers that ran tasks
+        # and the per-worker profiles they saved when the job ended
+        self.profileBase = None
+        self.profileWorkers = set()
+        self.profilePaths = []
+        self.profileDeadline = None
+        self.profileReportPath = None
+
+        # Result stores feeding the GUI views (not kept by headless runs)
+        if keepResults:
+            self.resultsStore = resultStore.ResultStore()
+            self.errorsStore = resultStore.ResultStore()
+        else:
+            self.resultsStore = None
+            self.errorsStore = None
+
+        # Start streaming the run's results and errors to disk
+        self.runLog = runLog.RunLog(logFilePath, toolName, resultsKey,
+                                    errorsKey)
+
+    # Class Function: Count, store and log a result record
+    def addRecord(self, record):
+        if record.status == resultRecord.TIMING:
+            self.metrics.add(*record.values)
+            if self.costModel != None and record.values[5] == 1:
+                self.costModel.add(self.taskFeatures[record.taskId],
+                                   record.values[2] - record.values[1])
+            self.runLog.writeTiming(record)
+            if self.profileBase != None:
+                self.profileWorkers.add(int(record.values[3]))
+        elif record.status == resultRecord.PROFILE:
+            self.profilePaths.append(record.label)
+        elif record.status == resultRecord.JOB_END:
+            self.jobEnded = True
+        elif record.status == resultRecord.RETRY:
+            self.retryCount += 1
+            self.runLog.write(record, self.retryCount)
+        elif record.status == resultRecord.ERROR:
+            self.errorCount += 1
+            if self.errorsStore != None:
+                self.errorsStore.append(record)
+            self.runLog.write(record, self.errorCount)
+        else:
+            self.progressCount += 1
+            self.columnStats.add(record.values, 1 if record.label else 0)
+            if self.resultsStore != None:
+                self.resultsStore.append(record)
+            self.runLog.write(record, self.progressCount)
+
+            # Record the input as completed for resumed runs
+            if self.manifest != None:
+                self.manifest.markDone(self.taskKeys[record.taskId])
+
+    # Class Function: Flush the run's files when their flush interval passed
+    def flushDue(self):
+        self.runLog.flushIfDue()
+        if self.manifest != None:
+            self.manifest.flushIfDue()
+
+    # Class Function: Check whether the run's files hold unflushed lines
+    def flushPending(self):
+        return (self.runLog.unflushed and not self.runLog.closed()) or \
+               (self.manifest != None and self.manifest.unflushed and
+                not self.manifest.manifestFile.closed)
+
+    # Class Function: Check whether the run is still preprocessing
+    def preprocessing(self):
+        return self.preprocess != None and not self.preprocess.finished
+
+    # Class Function: Number of tasks without a result or error yet
+    def incompleteCount(self):
+        return self.taskCount - (self.progressCount + self.errorCount)
+
+    # Class Function: Finalize the run log (later calls are ignored)
+    def closeLog(self, status):
+        self.metrics.finish()
+        self.runLog.close(status, self.progressCount, self.errorCount,
+                          self.metrics.summary(), self.retryCount,
+                          self.columnStats.summary())
+        if self.manifest != None:
+            self.manifest.close()
+        if self.costModel != None:
+            self.costModel.save()
+
+    # Class Function: Check whether worker profiles are still expected
+    # Profiles of terminated workers never arrive, so waiting stops after
+    # profileWait seconds
+    def profilePending(self, profileWait = 5.0):
+        if self.profileBase == None or \
+           len(self.profilePaths) >= len(self.profileWorkers):
+            return False
+        if self.profileDeadline == None:
+            self.profileDeadline = time.time() + profileWait
+        return time.time() < self.profileDeadline
+
+    # Class Function: Merge the worker profiles into the run's report
+    def writeProfile(self):
+        if self.profilePaths:
+            self.profileReportPath = profileReport.mergeProfiles(
+                self.profilePaths, self.profileBase)
+
+    # Class Function: Mark the run finished and finalize its log
+    def finish(self, status):
+        self.status = status
+        self.timeEnded = time.ctime()
+        self.closeLog(status)
+
+################################################################################
+# Class object: GUI independent scheduling, result collection and logging
+# The Tkinter menu and the command line runner are both clients
+class TaskEngine(object):
+    # Initializer
+    def __init__(self, workerCount, logsFolder = logsFolder,
+                 keepResults = True, toolFolders = (toolsFolder,)):
+        self.logsFolder = logsFolder
+        self.keepResults = keepResults
+        self.toolFolders = list(toolFolders)
+
+        # Preprocess results cached by tool version and input fingerprint
+        self.preprocessCacheFolder = os.path.join(logsFolder, 'PreprocessCache')
+
+        # Tools found in the tool folders, indexed without importing them
+        for toolFolder in toolFolders:
+            if toolFolder not in sys.path:
+                sys.path.append(toolFolder)
+        self.toolRegistry = toolRegistry.ToolRegistry(toolFolders)
+        self.toolsDictionary = self.toolRegistry.toolsDictionary()
+
+        # Runs with results still expected: pool job id -> engine run
+        self.runs = {}
+
+        # Packed records drained but not added yet and the unpacked rows of a
+        # partly added block (rows, next row), left over when a poll's time
+        # budget ran out
+        self.pendingRecords = collections.deque()
+        self.pendingRows = None
+
+        # Create the batched result channel and the warm worker pool
+        self.resultChannel = resultChannel.ResultChannel()
+        self.workerPool = workerPool.WorkerPool(workerCount,
+                                                self.resultChannel,
+                                                list(toolFolders))
+
+    # Class Function: Start a tool run on the worker pool
+    # Without an objectList the input folder is discovered in the background
+    # and found objects are fed to the workers while the walk continues
+    # Active runs share every worker in proportion to their weights; a
+    # cpuLimit caps the run's concurrent tasks.
+    # With profile set the run's tasks are profiled and the merged report is
+    # saved next to the run log once the run is retired
+    # Tools defining <toolName>Batch are sent blocks of tasks unless batch is
+    # False
+    # Tasks failing with a retryable error are retried up to retries times
+    # Tools needing preprocessing are preprocessed in a separate process
+    # (reusing a cached result when the inputs did not change); inputs are
+    # discovered meanwhile and dispatched once it finished
+    def startRun(self, toolName, objectList, inputFolder, outputFolder,
+                 weight, logOnly, profile = False, cpuLimit = None,
+                 batch = None, retries = workerPool.maxRetries):
+        discoverInputs = objectList == None
+        if discoverInputs:
+            objectList = []
+
+        # Tool metadata comes from the registry without importing the tool
+        tool = self.toolRegistry.tool(toolName)
+        if batch == None:
+            batch = self.toolRegistry.hasFunction(toolName, toolName + 'Batch')
+        preprocess = self.toolRegistry.metadata(toolName,
+                                                'pre_ProcessVariable') == True
+
+        # Create the run and its streamed log
+        if not os.path.isdir(self.logsFolder):
+            os.makedirs(self.logsFolder)
+        logFilePath = self._logFilePath(toolName)
+        run = EngineRun(toolName,
+                        len(objectList),
+                        self.toolRegistry.metadata(toolName, 'resultsKey')
+                        or fallbackResultsKey,
+                        self.toolRegistry.metadata(toolName, 'errorsKey')
+                        or fallbackErrorsKey,
+                        logFilePath,
+                        self.keepResults)
+        if profile:
+            run.profileBase = os.path.splitext(logFilePath)[0]
+
+        # Inputs completed by earlier runs into the same output folder are
+        # skipped during discovery, the others are dispatched most expensive
+        # first by the tool's cost model
+        # Log only runs write no outputs, so they neither skip nor record
+        # completed inputs
+        if discoverInputs:
+            if logOnly != 'YES':
+                run.manifest = completionManifest.CompletionManifest(
+                    os.path.join(outputFolder, '.' + toolName + '.manifest'),
+                    self.toolRegistry.version(toolName))
+            run.costModel = taskCost.CostModel(
+                os.path.join(self.logsFolder, '.' + toolName + '.costModel.json'))
+
+        # Hand the tasks to the warm worker pool
+        run.jobId = self.workerPool.submitJob(tool['module'],
+                                              toolName,
+                                              objectList,
+                                              outputFolder,
+                                              None if preprocess else [],
+                                              logOnly,
+                                              weight,
+                                              discoverInputs,
+                                              run.profileBase,
+                                              cpuLimit,
+                                              tool['stamp'],
+                                              batch,
+                                              retries,
+                                              held = preprocess)
+        self.runs[run.jobId] = run
+
+        # Start preprocessing; the job is held until its result arrives
+        if preprocess:
+            run.preprocess = preprocessStage.PreprocessStage(
+                tool['module'],
+                toolName,
+                self.toolRegistry.version(toolName),
+                inputFolder,
+                outputFolder,
+                self.preprocessCacheFolder,
+                self.toolFolders)
+
+        # Start the background discovery of the input folder
+        if discoverInputs:
+            run.discoveryDone = False
+            discoveryThread = threading.Thread(target = self._discoverInputs,
+                                               name = 'InputDiscovery',
+                                               args = (run, inputFolder))
+            discoveryThread.daemon = True
+            discoveryThread.start()
+        return run
+
+    # Class Function: Unused run log path named after the tool and the time
+    # (runs of a tool started within the same second are numbered)
+    def _logFilePath(self, toolName):
+        baseName = toolName + "_" + time.ctime().replace(' ','_').replace(':','-')
+        logFilePath = os.path.join(self.logsFolder, baseName + '.jsonl')
+        runNumber = 1
+        while os.path.exists(logFilePath):
+            runNumber += 1
+            logFilePath = os.path.join(self.logsFolder,
+                                       baseName + '_' + str(runNumber) + '.jsonl')
+        return logFilePath
+
+    # Class Function: Discovery thread feeding found objects to a run's job
+    def _discoverInputs(self, run, inputFolder):
+        # Function: Manifest key and cost features (from the size and image
+        # dimensions) of a found input, None when an earlier run completed
+        # it; called by the walker threads with the listing's stat
+        def describeInput(path, fileStat):
+            inputKey = completionManifest.inputKey(path, fileStat)
+            if run.manifest != None and run.manifest.isDone(inputKey):
+                return None
+            return inputKey, taskCost.inputFeatures(path, fileStat)
+
+        try:
+            for objectBatch in inputDiscovery.iterInputBatches(
+                    inputFolder, allowedImageFormats, describe = describeInput):
+                # Stop discovering once the run was killed
+                if run.status != 'running':
+                    break
+
+                # Skip inputs completed by an earlier run; the kept inputs'
+                # keys mark them completed when their results arrive
+                objectCount = len(objectBatch)
+                descriptions = [description for path, description
+                                in objectBatch if description != None]
+                objectBatch = [path for path, description in objectBatch
+                               if description != None]
+                run.skippedCount += objectCount - len(objectBatch)
+                if not objectBatch:
+                    continue
+                features = [description[1] for description in descriptions]
+                run.taskFeatures.extend(features)
+                run.taskKeys.extend([description[0]
+                                     for description in descriptions])
+                run.taskCount += len(objectBatch)
+                self.workerPool.addTasks(run.jobId,
+                                         objectBatch,
+                                         [run.costModel.cost(x) for x in features])
+        finally:
+            self.workerPool.closeJob(run.jobId)
+            run.discoveryDone = True
+
+    # Class Function: Pick up added, edited and removed tools
+    def refreshTools(self):
+        self.toolRegistry.refresh()
+        self.toolsDictionary = self.toolRegistry.toolsDictionary()
+
+    # Class Function: Number of workers running tasks of each active run
+    def workerShares(self):
+        return [(self.runs[jobId], running) for jobId, running
+                in sorted(self.workerPool.runningCounts().items())
+                if jobId in self.runs]
+
+    # Class Function: End a run early
+    # Tasks not started yet are dropped and running tasks are asked to stop;
+    # workers still busy with the run after the grace period are terminated
+    def killRun(self, run, gracePeriod = 0.3):
+        if run.status == 'running':
+            if run.preprocess != None:
+                run.preprocess.terminate()
+            self.workerPool.cancelJob(run.jobId)
+            run.status = 'killing'
+            run.killDeadline = time.time() + gracePeriod
+
+    # Class Function: Wake a client when results arrive instead of it polling
+    # on a timer: notify is called from a reader thread at most once between
+    # two polls
+    def notifyOnResults(self, notify):
+        self.resultChannel.startReader(notify)
+
+    # Class Function: Check whether a run can change without any result
+    # arriving (preprocessing, discovering, being killed or waiting to be
+    # retired) or has lines to flush, so a notified client must still poll
+    # on a timer
+    def needsPolling(self):
+        for run in self.runs.values():
+            if run.status != 'running' or run.preprocessing() or \
+               not run.discoveryDone or run.flushPending():
+                return True
+        return False
+
+    # Class Function: Collect results until the channel is empty or the time
+    # budget runs out; returns the runs that changed and whether results are
+    # still waiting
+    def poll(self, timeBudget, timeout = None):
+        pollDeadline = time.time() + timeBudget
+
+        # Results arriving from now on notify the client again
+        self.resultChannel.acknowledge()
+        updatedRuns = set()
+        resultsBacklog = False
+        while True:
+            # Finish the records left over by the last poll before draining
+            if self.pendingRows == None and not self.pendingRecords:
+                packedRecords = self.resultChannel.drain(1, timeout)
+                if not packedRecords:
+                    break
+                timeout = None
+                self.pendingRecords.extend(packedRecords)
+            if self.pendingRows == None:
+                self.pendingRows = (resultRecord.unpackRecords(
+                                        self.pendingRecords.popleft()), 0)
+
+            # Determine which run is associated with the record (every row
+            # of a block belongs to the same run) and add up to
+            # budgetCheckRows of its rows
+            records, firstRow = self.pendingRows
+            lastRow = min(len(records), firstRow + budgetCheckRows)
+            run = self.runs.get(records[0].toolId) if records else None
+            if run != None:
+                for row in xrange(firstRow, lastRow):
+                    run.addRecord(records[row])
+                updatedRuns.add(run)
+            self.pendingRows = (records, lastRow) if lastRow < len(records) \
+                               else None
+
+            # Stop once the time budget is spent; the rest is added by the
+            # next poll
+            if time.time() >= pollDeadline:
+                resultsBacklog = self.pendingRows != None or \
+                                 bool(self.pendingRecords) or \
+                                 not self.resultChannel.empty()
+                break
+
+        # Flush the runs' files on a timer and retire completed runs and
+        # killed runs the pool is done with
+        for jobId, run in self.runs.items():
+            run.flushDue()
+
+            # Fail the run when its tool failed to import in the workers or a
+            # worker died running one of its tasks (the pool cancelled the job)
+            jobError = self.workerPool.jobError(jobId)
+            if run.status == 'running' and jobError != None:
+                if run.preprocessing():
+                    run.preprocess.terminate()
+                run.addRecord(resultRecord.ResultRecord(
+                    jobId, 0, resultRecord.ERROR, run.toolName, (), jobError))
+                run.error = jobError
+                run.finish('failed')
+                updatedRuns.add(run)
+
+            # Release the held job once preprocessing finished, failing the
+            # run when it raised
+            elif run.status == 'running' and run.preprocessing():
+                if run.preprocess.poll():
+                    if run.preprocess.error != None:
+                        self.workerPool.cancelJob(jobId)
+                        run.addRecord(resultRecord.ResultRecord(
+                            jobId, 0, resultRecord.ERROR,
+                            'pre_' + run.toolName, (), run.preprocess.error))
+                        run.error = run.preprocess.error
+                        run.finish('failed')
+                    else:
+                        self.workerPool.releaseJob(jobId, run.preprocess.value)
+                updatedRuns.add(run)
+            elif run.status == 'running' and not run.discoveryDone:
+                updatedRuns.add(run)
+            # Completed once every task has a result or error and the job's
+            # end arrived, so the timings sent after the last results are
+            # added first
+            elif run.status == 'running' and run.incompleteCount() == 0 and \
+                 run.jobEnded:
+                run.finish('completed')
+                updatedRuns.add(run)
+            elif run.status == 'killing':
+                # Killed once its running tasks stopped and the records they
+                # sent were added, terminating the workers that ignored the
+                # cancellation past the deadline
+                if run.jobEnded:
+                    run.finish('killed')
+                    updatedRuns.add(run)
+                elif time.time() >= run.killDeadline:
+                    self.workerPool.terminateJob(jobId)
+            if run.status not in ('running', 'killing') and run.jobEnded and \
+               not run.profilePending():
+                run.writeProfile()
+                run.retired = True
+                updatedRuns.add(run)
+                del self.runs[jobId]
+
+        return updatedRuns, resultsBacklog
+
+    # Class Function: Finalize open logs and stop the worker pool
+    def shutdown(self):
+        for run in self.runs.values():
+            if run.preprocessing():
+                run.preprocess.terminate()
+            run.closeLog('ended')
+        self.workerPool.shutdown()
+
+################################################################################
+# Function: Command line runner for machines without a display
+def main(argv):
+    parser = argparse.ArgumentParser(description = 'Run a Multi Menu tool '
+                                     'without the graphical menu.')
+    parser.add_argument('tool', help = 'tool name from the Tools folder')
+    parser.add_argument('inputFolder', nargs = '?', help = 'input folder')
+    parser.add_argument('outputFolder', nargs = '?', help = 'output folder')
+    parser.add_argument('-w', '--workers', type = int,
+                        default = multiprocessing.cpu_count(),
+                        help = 'number of worker processes')
+    parser.add_argument('--cap', type = int,
+                        help = 'most tasks the run may process at once')
+    parser.add_argument('--retries', type = int, default = workerPool.maxRetries,
+                        help = 'times a task failing with a retryable error '
+                        'is retried')
+    parser.add_argument('--log-only', action = 'store_true',
+                        help = 'only log the results')
+    parser.add_argument('--profile', action = 'store_true',
+                        help = 'profile the workers and save a hot-spot report')
+    parser.add_argument('--test-tasks', type = int, default = 100,
+                        help = 'number of tasks given to test tools')
+    parser.add_argument('--logs', default = logsFolder,
+                        help = 'folder the run log is written to')
+    args = parser.parse_args(argv)
+
+    # Start the engine
+    engine = TaskEngine(args.workers, args.logs, keepResults = False)
+    try:
+        if args.tool not in engine.toolsDictionary:
+            parser.error('unknown tool: ' + args.tool)
+
+        # Build the task list
+        if isTestTool(args.tool):
+            objectList = range(args.test_tasks)
+        else:
+            if args.inputFolder == None or args.outputFolder == None:
+                parser.error('input and output folders are required')
+            if os.path.abspath(args.inputFolder) == os.path.abspath(args.outputFolder):
+                parser.error('output folder cannot be same as input folder')
+            objectList = None
+
+        # Start the run
+        run = engine.startRun(args.tool,
+                              objectList,
+                              args.inputFolder,
+                              args.outputFolder,
+                              1,
+                              'YES' if args.log_only else 'NO',
+                              args.profile,
+                              args.cap,
+                              retries = args.retries)
+        print args.tool + ': running on ' + str(args.workers) + ' workers'
+
+        # Print progress and throughput once a second until the run completes
+        # Ctrl+C kills the run and waits for its workers to stop
+        lastReport = 0.0
+        while run.status in ('running', 'killing'):
+            try:
+                engine.poll(0.05, timeout = 0.5)
+            except KeyboardInterrupt:
+                print args.tool + ': killing run...'
+                engine.killRun(run)
+            if time.time() - lastReport >= 1.0 or \
+               run.status not in ('running', 'killing'):
+                lastReport = time.time()
+                if run.preprocessing():
+                    print args.tool + ': ' + run.preprocess.status()
+                    continue
+                finishedCount = run.progressCount + run.errorCount
+                print '%s: %d/%d done%s, %d errors, %d retries | %s' \
+                      % (args.tool, finishedCount, run.taskCount,
+                         '' if run.discoveryDone else ' (discovering)',
+                         run.errorCount,
+                         run.retryCount,
+                         run.metrics.dashboard(run.incompleteCount()))
+
+        # Wait for the run to be retired so its profile report is written
+        while run.jobId in engine.runs:
+            engine.poll(0.05, timeout = 0.5)
+
+        if run.skippedCount > 0:
+            print str(run.skippedCount) + ' inputs skipped (completed by an earlier run)'
+        print 'Run log: ' + run.runLog.logFilePath
+        if run.profileReportPath != None:
+            print 'Profile report: ' + run.profileReportPath
+        if run.status == 'failed':
+            if run.preprocess != None and run.preprocess.error != None:
+                print args.tool + ': preprocessing failed: ' + run.error
+            else:
+                print args.tool + ': failed: ' + run.error
+            return 1
+    finally:
+        engine.shutdown()
+    return 0
+
+# Run from the command line
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+# Modules for task manifest
+import cPickle, mmap, os, struct
+
+# Entry kinds (first byte of every entry): byte strings and unicode paths are
+# stored as they are, other task items are pickled
+_BYTES = 'b'
+_UNICODE = 'u'
+_PICKLE = 'p'
+
+# Native unsigned long offsets; readers and writers run on the same machine
+_offset = struct.Struct('L')
+
+# Function: Encode a task item as a manifest entry
+def encodeItem(item):
+    if isinstance(item, str):
+        return _BYTES + item
+    if isinstance(item, unicode):
+        return _UNICODE + item.encode('utf-8')
+    return _PICKLE + cPickle.dumps(item, cPickle.HIGHEST_PROTOCOL)
+
+# Function: Decode a manifest entry
+def decodeItem(entry):
+    kind = entry[0]
+    if kind == _BYTES:
+        return entry[1:]
+    if kind == _UNICODE:
+        return entry[1:].decode('utf-8')
+    return cPickle.loads(entry[1:])
+
+################################################################################
+# Class object: Append-only task list shared with the workers through files
+# The items are stored once, back to back in path, and path.offsets holds the
+# end offset of every entry, so a worker given a task id reads its item from
+# the memory mapped files instead of receiving it pickled.
+class ManifestWriter(object):
+    # Initializer
+    def __init__(self, path):
+        self.path = path
+        self.blobFile = open(path, 'wb')
+        self.offsetsFile = open(path + '.offsets', 'wb')
+        self.blobSize = 0
+        self.count = 0
+
+    # Class Function: Append items; they are readable by the workers when
+    # this returns
+    def extend(self, items):
+        entries = []
+        offsets = []
+        for item in items:
+            entry = encodeItem(item)
+            self.blobSize += len(entry)
+            entries.append(entry)
+            offsets.append(_offset.pack(self.blobSize))
+        self.blobFile.write(''.join(entries))
+        self.offsetsFile.write(''.join(offsets))
+        self.blobFile.flush()
+        self.offsetsFile.flush()
+        self.count += len(offsets)
+
+    # Class Function: Close and remove the files (a file still mapped by a
+    # worker on Windows is left for the pool to remove at shutdown)
+    def close(self):
+        self.blobFile.close()
+        self.offsetsFile.close()
+        for path in (self.path, self.path + '.offsets'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+################################################################################
+# Class object: Worker side of a task manifest
+# The files are mapped read only and mapped again when a task id beyond the
+# mapped entries is asked for (the job was given more tasks)
+class ManifestReader(object):
+    # Initializer
+    def __init__(self, path):
+        self.path = path
+        self.blob = None
+        self.offsets = None
+        self.count = 0
+
+    # Class Function: Task item of a task id
+    def item(self, taskId):
+        if taskId >= self.count:
+            self._map()
+        start = _offset.unpack_from(self.offsets, (taskId - 1) * _offset.size)[0] \
+                if taskId > 0 else 0
+        end = _offset.unpack_from(self.offsets, taskId * _offset.size)[0]
+        return decodeItem(self.blob[start:end])
+
+    # Class Function: Map the files at their current size
+    def _map(self):
+        self.close()
+        with open(self.path + '.offsets', 'rb') as offsetsFile:
+            self.offsets = mmap.mmap(offsetsFile.fileno(), 0,
+                                     access = mmap.ACCESS_READ)
+        with open(self.path, 'rb') as blobFile:
+            self.blob = mmap.mmap(blobFile.fileno(), 0,
+                                  access = mmap.ACCESS_READ)
+        self.count = len(self.offsets) // _offset.size
+
+    # Class Function: Unmap the files
+    def close(self):
+        if self.blob != None:
+            self.blob.close()
+            self.offsets.close()
+            self.blob = None
+            self.offsets = None
+            self.count = 0
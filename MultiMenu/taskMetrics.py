@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+# Modules for task metrics
+import math, random, time
+
+# Function: Nearest rank percentile of sorted values
+def percentile(sortedValues, fraction):
+    if not sortedValues:
+        return 0.0
+    rank = int(round(fraction * (len(sortedValues) - 1)))
+    return sortedValues[rank]
+
+# Function: Seconds formatted as h:mm:ss
+def formatDuration(seconds):
+    seconds = int(round(seconds))
+    return '%d:%02d:%02d' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+################################################################################
+# Class object: Uniform sample of at most size values from a stream (Vitter's
+# algorithm L). The index of the next value to keep is drawn ahead, so values
+# in between cost a comparison; a value repeated count times is added at once.
+class Reservoir(object):
+    # Initializer
+    def __init__(self, size = 4096, seed = None):
+        self.size = size
+        self.values = []
+        self.count = 0
+        self.random = random.Random(seed)
+        self.weight = 1.0
+        self.nextIndex = None
+
+    # Class Function: Add a value count times
+    def add(self, value, count = 1):
+        # Fill the reservoir first
+        while count > 0 and len(self.values) < self.size:
+            self.values.append(value)
+            self.count += 1
+            count -= 1
+            if len(self.values) == self.size:
+                self._skip()
+
+        # Replace a random kept value at every drawn index in this run
+        end = self.count + count
+        while self.nextIndex != None and self.nextIndex < end:
+            self.values[self.random.randrange(self.size)] = value
+            self._skip()
+        self.count = end
+
+    # Class Function: Draw the index of the next kept value
+    def _skip(self):
+        self.weight *= math.exp(math.log(1.0 - self.random.random()) / self.size)
+        start = self.count if self.nextIndex == None else self.nextIndex + 1
+        self.nextIndex = start + int(math.log(1.0 - self.random.random()) /
+                                     math.log(1.0 - self.weight))
+
+################################################################################
+# Class object: Per-task timings of one run and the statistics derived from
+# them. Memory and summary cost do not grow with the task count: waits are
+# kept as a running total and latency percentiles come from a fixed size
+# sample; the summary is recomputed at most once per sampleInterval so a
+# dashboard can ask on every GUI tick.
+class TaskMetrics(object):
+    # Initializer
+    def __init__(self, smoothing = 0.3, sampleInterval = 1.0):
+        self.smoothing = smoothing
+        self.sampleInterval = sampleInterval
+        self.timeStarted = time.time()
+        self.timeEnded = None
+
+        # Task count, total seconds queued and a sample of the latencies
+        self.taskCount = 0
+        self.waitTotal = 0.0
+        self.latencies = Reservoir()
+        self.inputBytes = 0
+
+        # Seconds each worker spent running this run's tasks
+        self.workerBusy = {}
+
+        # Completion rate smoothed by an exponentially weighted moving average
+        self.rate = None
+        self.rateSampleTime = self.timeStarted
+        self.rateSampleCount = 0
+
+        # Last computed summary
+        self.summaryCache = None
+        self.summaryTime = 0.0
+
+    # Class Function: Add the timing of a finished task or block of tasks
+    # Every item of a block counts with the block's wait and mean time per
+    # item
+    def add(self, queued, started, ended, workerId, inputSize, itemCount = 1):
+        itemCount = int(itemCount)
+        self.taskCount += itemCount
+        self.waitTotal += max(0.0, started - queued) * itemCount
+        self.latencies.add((ended - started) / itemCount, itemCount)
+        self.inputBytes += int(inputSize)
+        workerId = int(workerId)
+        self.workerBusy[workerId] = self.workerBusy.get(workerId, 0.0) + \
+                                    (ended - started)
+
+    # Class Function: Freeze the elapsed time once the run is finished
+    def finish(self):
+        if self.timeEnded == None:
+            self.timeEnded = time.time()
+            self.summaryCache = None
+
+    # Class Function: Fold the completions since the last sample into the
+    # smoothed rate
+    def _updateRate(self, now):
+        sampleSeconds = now - self.rateSampleTime
+        if sampleSeconds < self.sampleInterval:
+            return
+        sampleRate = (self.taskCount - self.rateSampleCount) / sampleSeconds
+        if self.rate == None:
+            self.rate = sampleRate
+        else:
+            self.rate = self.smoothing * sampleRate + \
+                        (1.0 - self.smoothing) * self.rate
+        self.rateSampleTime = now
+        self.rateSampleCount = self.taskCount
+
+    # Class Function: Statistics of the run so far as a JSON friendly dict
+    # The ETA is derived from the smoothed rate and the tasks still incomplete
+    def summary(self, incompleteCount = 0):
+        now = self.timeEnded or time.time()
+        if self.summaryCache == None or \
+           now - self.summaryTime >= self.sampleInterval:
+            self._updateRate(now)
+            elapsed = max(now - self.timeStarted, 1e-6)
+            taskCount = self.taskCount
+            latencies = sorted(self.latencies.values)
+            self.summaryCache = {
+                'tasks': taskCount,
+                'elapsed': elapsed,
+                'itemsPerSecond': taskCount / elapsed,
+                'smoothedRate': self.rate if self.rate != None else taskCount / elapsed,
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'meanWait': self.waitTotal / taskCount if taskCount else 0.0,
+                'inputBytes': self.inputBytes,
+                'utilization': dict((str(workerId), busy / elapsed)
+                                    for workerId, busy
+                                    in sorted(self.workerBusy.items()))}
+            self.summaryTime = now
+
+        # ETA only while tasks remain and a rate is known
+        summary = dict(self.summaryCache)
+        if incompleteCount > 0 and summary['smoothedRate'] > 0:
+            summary['eta'] = incompleteCount / summary['smoothedRate']
+        else:
+            summary['eta'] = None
+        return summary
+
+    # Class Function: One line dashboard text
+    def dashboard(self, incompleteCount = 0):
+        summary = self.summary(incompleteCount)
+        utilization = ' '.join(['%d' % round(100 * value) for workerId, value
+                                in sorted(summary['utilization'].items(),
+                                          key = lambda item: int(item[0]))])
+        return '%.1f items/s | p50 %.2fs p95 %.2fs p99 %.2fs | busy %% %s | ETA %s' \
+               % (summary['smoothedRate'],
+                  summary['p50'],
+                  summary['p95'],
+                  summary['p99'],
+                  utilization or '-',
+                  formatDuration(summary['eta']) if summary['eta'] != None else '-')
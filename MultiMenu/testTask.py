@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+# Modules for test task
+import time
+
+# NumPy is optional; without it the test tools have no batch function
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+################################################################################
+# Function: Sleep for seconds of simulated processing, checking for
+# cancellation in short slices so a killed run stops promptly; returns whether
+# the work finished
+def simulateWork(queue, seconds):
+    sleepEnd = time.time() + seconds
+    while time.time() < sleepEnd:
+        if queue.cancelled():
+            return False
+        time.sleep(0.1)
+    return True
+
+################################################################################
+# Function: Process a block of random tasks (queue.taskIds) and send their rows
+# in two block messages, generating the random numbers for the whole block at
+# once (needs NumPy)
+# Every task still takes its own 1 to 10 seconds of simulated processing, so
+# the block takes as long as its tasks one by one
+def randomTaskBlock(variableList, queue):
+    taskCount = len(variableList)
+    taskIds = numpy.asarray(queue.taskIds)
+    numbers = numpy.random.randint(0, 1001, taskCount)
+    if not simulateWork(queue, numpy.random.randint(1, 11, taskCount).sum()):
+        return
+
+    # Create random decimals to 3 places, three per task
+    digits = numpy.random.randint(1, 10, (taskCount, 3, 4))
+    randomDecimals = numpy.random.randint(2, 7, (taskCount, 3)) * \
+                     numpy.random.randint(1, 8, (taskCount, 3)) * \
+                     (digits[:, :, 0] + digits[:, :, 1] / 10.0 +
+                      digits[:, :, 2] / 100.0 + digits[:, :, 3] / 1000.0)
+    labels = numpy.char.mod('randTask-%d', numbers)
+
+    # Simulate a 20 percent error rate
+    resultMask = numbers > 200
+    if resultMask.any():
+        queue.resultBlock(labels[resultMask],
+                          randomDecimals[resultMask],
+                          'This was a random task that multi menu is processing.',
+                          taskIds[resultMask])
+    if not resultMask.all():
+        queue.errorBlock(labels[~resultMask],
+                         'Experienced an error.',
+                         taskIds[~resultMask])
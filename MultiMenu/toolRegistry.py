@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+# Modules for tool registry
+import ast, json, os, re, sys
+
+# Name of the metadata index kept in every tool folder
+indexFileName = '.toolIndex.json'
+
+# Tool functions whose literal return values are read without importing
+metadataFunctions = ('pre_ProcessVariable', 'resultsKey', 'errorsKey',
+                     'toolVersion')
+
+# Function: Literal return values of a tool module's metadata functions and
+# the names of every function it defines (conditional definitions included;
+# workers report a batch function that turns out not to be defined)
+# Functions returning anything but a literal map to None, which makes the
+# registry import the module for that value
+def readMetadata(toolPath):
+    with open(toolPath) as toolFile:
+        moduleNode = ast.parse(toolFile.read(), toolPath)
+    metadata = {}
+    functions = sorted(set([node.name for node in ast.walk(moduleNode)
+                            if isinstance(node, ast.FunctionDef)]))
+    for node in moduleNode.body:
+        if isinstance(node, ast.FunctionDef) and node.name in metadataFunctions:
+            returnNodes = [x for x in node.body if isinstance(x, ast.Return)]
+            value = None
+            if len(node.body) == 1 and returnNodes and returnNodes[0].value != None:
+                try:
+                    value = ast.literal_eval(returnNodes[0].value)
+                except ValueError:
+                    value = None
+            metadata[node.name] = value
+    return metadata, functions
+
+################################################################################
+# Class object: Index of the tools found in the tool folders
+# Tool metadata is read from the source with ast, so listing tools and
+# starting runs does not import tool code. The index is cached in each tool
+# folder and an entry is read again only when its file's mtime or size
+# changes. Edited tools are reloaded by importTool and by the workers.
+class ToolRegistry(object):
+    # Initializer
+    def __init__(self, toolFolders):
+        self.toolFolders = list(toolFolders)
+
+        # Tool name -> index entry
+        self.tools = {}
+
+        # Cached index entries of every folder: folder -> {file name: entry}
+        self.folderIndexes = {}
+        for toolFolder in self.toolFolders:
+            self.folderIndexes[toolFolder] = self._loadIndex(toolFolder)
+        self.refresh()
+
+    # Class Function: Tool name -> module name of every tool
+    def toolsDictionary(self):
+        return dict((toolName, entry['module'])
+                    for toolName, entry in self.tools.items())
+
+    # Class Function: Index entry of a tool, read again when its file changed
+    def tool(self, toolName):
+        entry = self.tools[toolName]
+        fileStat = os.stat(entry['path'])
+        if [fileStat.st_mtime, fileStat.st_size] != entry['stamp']:
+            self.refresh()
+        return self.tools[toolName]
+
+    # Class Function: Find added, edited and removed tools
+    def refresh(self):
+        self.tools = {}
+        for toolFolder in self.toolFolders:
+            folderIndex = self.folderIndexes[toolFolder]
+            changed = False
+            fileNames = [x for x in os.listdir(toolFolder) if x.endswith('.py')]
+
+            # Forget removed tools
+            for fileName in folderIndex.keys():
+                if fileName not in fileNames:
+                    del folderIndex[fileName]
+                    changed = True
+
+            for fileName in fileNames:
+                toolPath = os.path.join(toolFolder, fileName)
+                fileStat = os.stat(toolPath)
+                stamp = [fileStat.st_mtime, fileStat.st_size]
+
+                # Read the metadata of new and edited tools
+                entry = folderIndex.get(fileName)
+                if entry == None or entry['stamp'] != stamp or \
+                   'functions' not in entry:
+                    moduleName = re.search(r'(.*?)\.', fileName).group(1)
+                    try:
+                        metadata, functions = readMetadata(toolPath)
+                    except SyntaxError:
+                        metadata, functions = {}, []
+                    entry = {'module': moduleName,
+                             'path': toolPath,
+                             'stamp': stamp,
+                             'metadata': metadata,
+                             'functions': functions}
+                    folderIndex[fileName] = entry
+                    changed = True
+
+                entry['module'] = str(entry['module'])
+                entry['path'] = toolPath
+                toolName = re.search(r'[\d]*([\w\d-]*)', entry['module']).group(1)
+                self.tools[toolName] = entry
+
+            if changed:
+                self._saveIndex(toolFolder, folderIndex)
+
+    # Class Function: Metadata value of a tool, importing the tool only when
+    # the value is not a literal in its source (None when the tool or the
+    # metadata function raises)
+    def metadata(self, toolName, functionName):
+        entry = self.tool(toolName)
+        value = entry['metadata'].get(functionName)
+        if value == None and functionName in entry['metadata']:
+            module = self.importTool(toolName)
+            try:
+                value = getattr(module, functionName)() if module != None \
+                        else None
+            except Exception:
+                value = None
+        return value
+
+    # Class Function: Check whether a tool defines a function
+    def hasFunction(self, toolName, functionName):
+        return functionName in self.tool(toolName)['functions']
+
+    # Class Function: Version of a tool keying its completion manifest
+    # Tools may define toolVersion(); otherwise the source file's mtime is used
+    def version(self, toolName):
+        if 'toolVersion' in self.tool(toolName)['metadata']:
+            return self.metadata(toolName, 'toolVersion')
+        return int(self.tool(toolName)['stamp'][0])
+
+    # Class Function: Import a tool module, reloading it when its file changed
+    # since it was imported; None when the import raises (the workers fail
+    # the tool's runs with the error)
+    def importTool(self, toolName):
+        entry = self.tool(toolName)
+        try:
+            module = sys.modules.get(entry['module'])
+            if module == None:
+                module = __import__(entry['module'])
+            elif getattr(module, '_registryStamp', None) != entry['stamp']:
+                module = reload(module)
+        except Exception:
+            return None
+        module._registryStamp = entry['stamp']
+        return module
+
+    # Class Function: Read a folder's cached index
+    def _loadIndex(self, toolFolder):
+        try:
+            with open(os.path.join(toolFolder, indexFileName)) as indexFile:
+                return json.load(indexFile)
+        except (IOError, ValueError):
+            return {}
+
+    # Class Function: Write a folder's cached index (read-only folders just
+    # keep the index in memory)
+    def _saveIndex(self, toolFolder, folderIndex):
+        try:
+            with open(os.path.join(toolFolder, indexFileName), 'w') as indexFile:
+                json.dump(folderIndex, indexFile, indent = 1, sort_keys = True)
+        except IOError:
+            pass
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# Modules for virtual list
+import Tkinter
+
+################################################################################
+# Class object: Virtualized view of a result store in a fixed size list box
+# Only the rows inside the visible window are inserted into the list box and
+# the vertical scroll bar is driven from the store's row count
+class VirtualList(object):
+    # Initializer
+    def __init__(self, listBox, scrollBar, store):
+        self.listBox = listBox
+        self.scrollBar = scrollBar
+        self.store = store
+        self.height = int(listBox.cget('height'))
+        self.first = 0
+        self.rendered = None
+        self.following = True
+
+        # Drive the vertical scroll bar and mouse wheel from the view
+        self.scrollBar.config(command = self.yview)
+        self.listBox.bind('<MouseWheel>', self._mouseWheel)
+        self.listBox.bind('<Button-4>', lambda event: self.yview('scroll', -1, 'units'))
+        self.listBox.bind('<Button-5>', lambda event: self.yview('scroll', 1, 'units'))
+
+    # Class Function: Remove every row
+    def clear(self):
+        self.store.clear()
+        self.first = 0
+        self.following = True
+        self.refresh()
+
+    # Class Function: Show another store from its last rows
+    def setStore(self, store):
+        self.store = store
+        self.first = 0
+        self.rendered = None
+        self.following = True
+        self.refresh()
+
+    # Class Function: Scroll bar command ('moveto' and 'scroll' requests)
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * len(self.store))
+        elif args[0] == 'scroll':
+            step = self.height if args[2] == 'pages' else 1
+            self.first += int(args[1]) * step
+        self._clampFirst()
+
+        # Keep following new rows while the view is at the bottom
+        self.following = self.first + self.height >= len(self.store)
+        self.refresh()
+
+    # Class Function: Redraw the visible window if it changed
+    def refresh(self):
+        rowCount = len(self.store)
+        if self.following:
+            self.first = max(0, rowCount - self.height)
+
+        # Rows in view only change when the window moved or was not full
+        window = (self.first, min(rowCount, self.first + self.height))
+        if window != self.rendered:
+            self.listBox.delete(0, Tkinter.END)
+            rows = self.store.rows(window[0], window[1])
+            if rows:
+                self.listBox.insert(Tkinter.END, *rows)
+            self.rendered = window
+
+            # Scroll bar shows the window's position within the whole store
+            if rowCount > 0:
+                self.scrollBar.set(float(window[0]) / rowCount,
+                                   float(window[0] + self.height) / rowCount)
+            else:
+                self.scrollBar.set(0.0, 1.0)
+
+    # Class Function: Mouse wheel scrolling
+    def _mouseWheel(self, event):
+        self.yview('scroll', -1 if event.delta > 0 else 1, 'units')
+        return 'break'
+
+    # Class Function: Keep the window inside the store
+    def _clampFirst(self):
+        self.first = max(0, min(self.first, len(self.store) - self.height))
@@ -0,0 +1,738 @@
+# -*- coding: utf-8 -*-
+
+# Modules for worker pool
+import collections, cProfile, functools, heapq, itertools, multiprocessing,\
+       os, resultChannel, resultRecord, shutil, sys, taskManifest, tempfile,\
+       threading, time
+
+# Number of shared cancellation flags (job ids reuse slots modulo this count)
+cancelSlots = 1024
+
+# Batch jobs are sent in blocks sized to take at most about blockSeconds
+# each, up to maxBlockSize items
+blockSeconds = 0.05
+maxBlockSize = 1024
+
+# Seconds between checks for workers that died (a quiet status pipe is
+# checked at least this often)
+workerCheckInterval = 1.0
+
+# Tasks that fail with a retryable error are retried up to maxRetries times,
+# the n-th retry after retryDelay * 2 ** (n - 1) seconds (at most
+# maxRetryDelay)
+maxRetries = 3
+retryDelay = 1.0
+maxRetryDelay = 30.0
+
+################################################################################
+# Class object: Queue-like object handed to tools
+# Adds cooperative cancellation and output claims to the record queue:
+# tools should check cancelled() between items and call startOutput() before
+# writing an output file so a terminated task's partial file is removed
+class ToolQueue(resultRecord.RecordQueue):
+    __slots__ = ('cancelFlags', 'statusPipe', 'workerId')
+
+    # Initializer
+    def __init__(self, queue, toolId, toolName, cancelFlags, statusPipe,
+                 workerId):
+        resultRecord.RecordQueue.__init__(self, queue, toolId, toolName)
+        self.cancelFlags = cancelFlags
+        self.statusPipe = statusPipe
+        self.workerId = workerId
+
+    # Class Function: Check whether the job was cancelled
+    def cancelled(self):
+        return self.cancelFlags[self.toolId % cancelSlots] != 0
+
+    # Class Function: Claim an output file the current task is about to write
+    def startOutput(self, outputPath):
+        self.statusPipe.put(('output', self.workerId, outputPath))
+
+# Function: Size in bytes of a task's input file (0 for other task items)
+def _inputSize(item):
+    if isinstance(item, basestring):
+        try:
+            return os.path.getsize(item)
+        except OSError:
+            pass
+    return 0
+
+# Function: Check whether a raised error is worth retrying
+# Environment errors (locked files, unreachable shares) are often transient
+def _retryableError(error):
+    return isinstance(error, EnvironmentError)
+
+################################################################################
+# Function: Long lived pool worker
+# Each worker owns an inbox that carries job specifications, task ids and job
+# endings; the task items are read from the job's shared task manifest. Tool
+# modules stay imported between jobs so back to back runs do not pay the
+# import cost again.
+def _poolWorker(workerId, inbox, statusPipe, channel, cancelFlags,
+                searchPaths):
+    # Make the tool folders importable when the worker was spawned fresh
+    for searchPath in searchPaths:
+        if searchPath not in sys.path:
+            sys.path.append(searchPath)
+
+    # Batched writer to the menu's result channel
+    channelWriter = channel.writer()
+    channelWriter.startFlusher()
+
+    # Source stamps of the tool modules imported by this worker
+    moduleStamps = {}
+
+    # Jobs known to this worker (None for jobs whose tool failed to import):
+    # job id -> (tool call, destination, pre, logOnly, tool queue, profiler,
+    #            profile path, batch call, task manifest)
+    jobs = {}
+
+    # Tell the dispatcher this worker is ready for tasks
+    statusPipe.put(('ready', workerId))
+
+    # Process inbox messages until the stop sentinel is received
+    for message in iter(inbox.get, None):
+        messageType, jobId = message[0], message[1]
+
+        # Job specification: import the tool module once and keep it loaded,
+        # reloading it when the job was started from an edited source file
+        # A tool that fails to import fails the job; the worker keeps serving
+        # the other jobs
+        if messageType == 'job':
+            moduleName, methodName, destinationFolder, preProcessVariable,\
+                        logOnly, profilePath, moduleStamp, batch,\
+                        manifestPath = message[2:]
+            try:
+                module = sys.modules.get(moduleName)
+                if module == None:
+                    module = __import__(moduleName)
+                elif moduleStamps.get(moduleName) != moduleStamp:
+                    module = reload(module)
+                moduleStamps[moduleName] = moduleStamp
+                toolCall = getattr(module, methodName)
+            except Exception as error:
+                jobs[jobId] = None
+                statusPipe.put(('failed', workerId, jobId,
+                                'Raised ' + repr(error)))
+                continue
+
+            # Batch jobs call the tool's optional <method>Batch function with
+            # whole blocks and fall back to per item calls without one; the
+            # pool is told when it is missing (a tool may define it only on
+            # machines with its dependencies) so it sends single tasks
+            batchCall = None
+            if batch:
+                batchCall = getattr(module, methodName + 'Batch', None)
+                if batchCall == None:
+                    statusPipe.put(('unbatched', workerId, jobId))
+
+            # Profiled jobs call the tool through the job's profiler; other
+            # jobs call it directly
+            profiler = None
+            if profilePath != None:
+                profiler = cProfile.Profile()
+                toolCall = functools.partial(profiler.runcall, toolCall)
+                if batchCall != None:
+                    batchCall = functools.partial(profiler.runcall, batchCall)
+            jobs[jobId] = (toolCall,
+                           destinationFolder,
+                           preProcessVariable,
+                           logOnly,
+                           ToolQueue(channelWriter,
+                                     jobId,
+                                     methodName,
+                                     cancelFlags,
+                                     statusPipe,
+                                     workerId),
+                           profiler,
+                           profilePath,
+                           batchCall,
+                           taskManifest.ManifestReader(manifestPath))
+
+        # Task or block of tasks: a batch tool gets the whole block in one
+        # call, other tools get a single item list per task to keep the
+        # taskNFix contract
+        elif messageType in ('task', 'block'):
+            if messageType == 'task':
+                taskIds, queued = [message[2]], message[3]
+                retryIds = taskIds if message[4] else []
+            else:
+                taskIds, queued, retryIds = message[2:]
+
+            # Tasks of a job whose tool failed to import are handed back
+            # (the pool cancels the job)
+            if jobs.get(jobId) == None:
+                statusPipe.put(('done', workerId, jobId, taskIds[0],
+                                len(taskIds), 0.0, []))
+                continue
+            methodToCall, destinationFolder, preProcessVariable, logOnly,\
+                          toolQueue = jobs[jobId][:5]
+            batchCall, manifest = jobs[jobId][7:]
+            items = [manifest.item(taskId) for taskId in taskIds]
+            toolQueue.retryIds = set(retryIds)
+            toolQueue.retriedIds.clear()
+            started = time.time()
+
+            # Tasks of a cancelled job are skipped
+            if not toolQueue.cancelled():
+                if batchCall != None:
+                    toolQueue.taskIds = taskIds
+                    toolQueue.taskId = taskIds[0]
+                    toolQueue.reportedIds.clear()
+                    try:
+                        batchCall(items,
+                                  destinationFolder,
+                                  preProcessVariable,
+                                  logOnly,
+                                  toolQueue)
+                    except Exception as error:
+                        # Report the rows the block did not send as errors
+                        failedRows = [(taskId, item) for taskId, item
+                                      in zip(taskIds, items)
+                                      if taskId not in toolQueue.reportedIds]
+                        if failedRows:
+                            toolQueue.errorBlock([str(x[1]) for x in failedRows],
+                                                 'Raised ' + repr(error),
+                                                 [x[0] for x in failedRows],
+                                                 _retryableError(error))
+                else:
+                    for taskId, item in zip(taskIds, items):
+                        toolQueue.taskId = taskId
+                        try:
+                            methodToCall([item],
+                                         destinationFolder,
+                                         preProcessVariable,
+                                         logOnly,
+                                         toolQueue)
+                        except Exception as error:
+                            # Report the failure as an error so the task is
+                            # still counted
+                            toolQueue.error(str(item), 'Raised ' + repr(error),
+                                            _retryableError(error))
+
+                        # A killed run stops between the items of a block
+                        if toolQueue.cancelled():
+                            break
+
+                # Time the task without the tool's involvement
+                channelWriter.put(resultRecord.ResultRecord(
+                    jobId, taskIds[0], resultRecord.TIMING, '',
+                    (queued, started, time.time(), workerId,
+                     sum([_inputSize(item) for item in items]),
+                     len(items))).pack())
+
+            # Send the task's buffered results before reporting it finished
+            channelWriter.flush()
+
+            # Report the finished task so the dispatcher sends the next one
+            # and queues the retried tasks again
+            statusPipe.put(('done', workerId, jobId, taskIds[0], len(items),
+                            time.time() - started,
+                            [taskId for taskId in taskIds
+                             if taskId in toolQueue.retriedIds]))
+
+        # Job ending: release the job's preprocess variable and task
+        # manifest and save the worker's profile of the job for the engine to
+        # merge
+        elif messageType == 'end':
+            job = jobs.pop(jobId, None)
+            if job != None:
+                job[8].close()
+            if job != None and job[5] != None and job[5].getstats():
+                workerProfilePath = job[6] + '.' + str(workerId)
+                job[5].dump_stats(workerProfilePath)
+                channelWriter.put(resultRecord.ResultRecord(
+                    jobId, 0, resultRecord.PROFILE, workerProfilePath).pack())
+                channelWriter.flush()
+
+################################################################################
+# Class object: Pending tasks of a job as (task id, queued time), served
+# highest cost first and in submission order among equal costs, so jobs
+# without costs stay first in first out. Due retries go ahead of every
+# fresh task.
+class PendingTasks(object):
+    # Initializer
+    def __init__(self):
+        self.heap = []
+        self.sequence = itertools.count()
+
+    # Class Function: Number of pending tasks
+    def __len__(self):
+        return len(self.heap)
+
+    # Class Function: Add tasks with their estimated costs
+    def extend(self, tasks, costs = None):
+        if costs == None:
+            costs = itertools.repeat(0.0)
+        entries = [(-cost, next(self.sequence), taskIndex, queued)
+                   for (taskIndex, queued), cost in itertools.izip(tasks, costs)]
+
+        # Heapify large additions at once, push small ones
+        if len(entries) > len(self.heap):
+            self.heap.extend(entries)
+            heapq.heapify(self.heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self.heap, entry)
+
+    # Class Function: Add a task ahead of the fresh tasks
+    def pushFront(self, taskIndex, queued):
+        heapq.heappush(self.heap, (float('-inf'), next(self.sequence), taskIndex,
+                                   queued))
+
+    # Class Function: Remove and return the next task
+    def pop(self):
+        entry = heapq.heappop(self.heap)
+        return entry[2], entry[3]
+
+    # Class Function: Drop every pending task
+    def clear(self):
+        del self.heap[:]
+
+################################################################################
+# Class object: Persistent pool of warm workers shared by every menu tab
+class WorkerPool(object):
+    # Initializer
+    def __init__(self, workerCount, channel, searchPaths = ()):
+        # Pipe every worker reports its status on
+        self.statusPipe = resultChannel.LockedPipe()
+        self.channel = channel
+        self.searchPaths = list(searchPaths)
+
+        # Folder of the jobs' task manifests
+        self.manifestFolder = tempfile.mkdtemp(prefix = 'multiMenuTasks')
+
+        # Shared cancellation flags checked by workers and tools
+        self.cancelFlags = multiprocessing.Array('b', cancelSlots, lock = False)
+
+        # Pool state shared by the GUI thread and the dispatcher thread
+        self.lock = threading.Lock()
+        self.jobCounter = itertools.count(1)
+        self.jobs = collections.OrderedDict()
+        self.idleWorkers = collections.deque()
+        self.busyWorkers = {}
+        self.workerOutputs = collections.defaultdict(list)
+        self.terminatingWorkers = set()
+        self.lastWorkerCheck = time.time()
+        self.workers = [None] * workerCount
+
+        # Errors of the jobs failed by the pool: job id -> error message
+        self.jobErrors = {}
+        self.inboxes = [None] * workerCount
+
+        # Start the workers
+        for workerId in range(workerCount):
+            self._startWorker(workerId)
+
+        # Start the dispatcher thread
+        self.dispatcher = threading.Thread(target = self._dispatchLoop,
+                                           name = 'PoolDispatcher')
+        self.dispatcher.daemon = True
+        self.dispatcher.start()
+
+    # Class Function: Submit a job and return its id
+    # Active jobs share the workers in proportion to their weights; a job
+    # with a cpuLimit never runs more than cpuLimit tasks at once.
+    # An open job keeps accepting tasks through addTasks until closeJob.
+    # With a profilePath every worker profiles the job's tasks and saves its
+    # profile to profilePath.<worker id> when the job ends.
+    # moduleStamp identifies the tool's source; workers reload the tool
+    # module when it differs from the stamp they imported it with.
+    # A batch job's tasks are sent in blocks the pool sizes from the measured
+    # time per item.
+    # Tasks failing with a retryable error are queued again after a growing
+    # delay, up to retries times; fresh tasks keep running in the meantime.
+    # The tasks are written once to the job's task manifest and the workers
+    # are only sent task ids.
+    # Tasks given estimated costs are dispatched most expensive first.
+    # A held job takes tasks but dispatches none until releaseJob hands it
+    # its preprocess variable.
+    def submitJob(self, moduleName, methodName, tasks, destinationFolder,
+                  preProcessVariable, logOnly, weight, openJob = False,
+                  profilePath = None, cpuLimit = None, moduleStamp = None,
+                  batch = False, retries = maxRetries, costs = None,
+                  held = False):
+        with self.lock:
+            jobId = next(self.jobCounter)
+            self.cancelFlags[jobId % cancelSlots] = 0
+            queued = time.time()
+            manifest = taskManifest.ManifestWriter(
+                os.path.join(self.manifestFolder, 'job' + str(jobId) + '.tasks'))
+            manifest.extend(tasks)
+            self.jobs[jobId] = {'pending': PendingTasks(),
+                                'manifest': manifest,
+                                'taskCount': manifest.count,
+                                'running': 0,
+                                'open': openJob,
+                                'held': held,
+                                'failed': False,
+                                'served': 0,
+                                'weight': float(max(1, weight)),
+                                'cpuLimit': max(1, cpuLimit or len(self.workers)),
+                                'batch': batch,
+                                'itemSeconds': None,
+                                'itemDeviation': 0.0,
+                                'retries': retries,
+                                'attempts': {},
+                                'delayed': [],
+                                'spec': ('job', jobId, moduleName, methodName,
+                                         destinationFolder, preProcessVariable,
+                                         logOnly, profilePath, moduleStamp,
+                                         batch, manifest.path)}
+            self.jobs[jobId]['pending'].extend(((taskIndex, queued) for taskIndex
+                                                in xrange(manifest.count)),
+                                               costs)
+
+            # Send the job specification ahead of its tasks so every worker
+            # imports the tool module while the first tasks are dispatched
+            for inbox in self.inboxes:
+                inbox.put(self.jobs[jobId]['spec'])
+
+            self._dispatch()
+        return jobId
+
+    # Class Function: Add tasks to an open job, optionally with their
+    # estimated costs
+    def addTasks(self, jobId, tasks, costs = None):
+        with self.lock:
+            job = self.jobs.get(jobId)
+            if job != None and job['open']:
+                queued = time.time()
+                job['manifest'].extend(tasks)
+                job['pending'].extend(((taskIndex, queued) for taskIndex
+                                       in xrange(job['taskCount'],
+                                                 job['manifest'].count)),
+                                      costs)
+                job['taskCount'] = job['manifest'].count
+                self._dispatch()
+
+    # Class Function: Start dispatching a held job's tasks with its
+    # preprocess variable
+    def releaseJob(self, jobId, preProcessVariable):
+        with self.lock:
+            job = self.jobs.get(jobId)
+            if job != None and job['held']:
+                job['spec'] = job['spec'][:5] + (preProcessVariable,) + \
+                              job['spec'][6:]
+                for inbox in self.inboxes:
+                    inbox.put(job['spec'])
+                job['held'] = False
+                self._dispatch()
+
+    # Class Function: Stop accepting tasks for a job
+    def closeJob(self, jobId):
+        with self.lock:
+            if jobId in self.jobs:
+                self.jobs[jobId]['open'] = False
+                self._dispatch()
+
+    # Class Function: Cancel a job
+    # Pending tasks are dropped and the shared cancellation flag tells running
+    # tasks to stop at their next cancelled() check
+    def cancelJob(self, jobId):
+        with self.lock:
+            self._cancelJob(jobId)
+            self._dispatch()
+
+    # Class Function: Error that failed a job (its tool failed to import or a
+    # worker died running its task), None while it did not fail; the error
+    # is forgotten once returned
+    def jobError(self, jobId):
+        with self.lock:
+            return self.jobErrors.pop(jobId, None)
+
+    # Class Function: Terminate the workers still running tasks of a job
+    # A worker is only terminated while both shared write locks are held, so
+    # it cannot die halfway through writing a message; workers that hold a
+    # lock right now are left for the next call. Returns the number of
+    # workers still running tasks of the job.
+    def terminateJob(self, jobId):
+        with self.lock:
+            for workerId, (busyJobId, taskIndex) in self.busyWorkers.items():
+                if busyJobId != jobId or workerId in self.terminatingWorkers:
+                    continue
+                if not self.channel.pipe.writeLock.acquire(False):
+                    continue
+                try:
+                    if not self.statusPipe.writeLock.acquire(False):
+                        continue
+                    try:
+                        self.workers[workerId].terminate()
+                        self.workers[workerId].join()
+                        self.terminatingWorkers.add(workerId)
+
+                        # Queued behind the worker's last messages, so the
+                        # dispatcher sees its output claims first
+                        self.statusPipe.sendConnection.send(('terminated',
+                                                             workerId))
+                    finally:
+                        self.statusPipe.writeLock.release()
+                finally:
+                    self.channel.pipe.writeLock.release()
+
+            return len([x for x in self.busyWorkers.values() if x[0] == jobId])
+
+    # Class Function: Number of running tasks of every active job
+    def runningCounts(self):
+        with self.lock:
+            return dict((jobId, job['running'])
+                        for jobId, job in self.jobs.items())
+
+    # Class Function: Check whether a job still has pending or running tasks
+    def jobActive(self, jobId):
+        with self.lock:
+            return jobId in self.jobs
+
+    # Class Function: Stop the dispatcher and every worker
+    def shutdown(self):
+        self.statusPipe.put(None)
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for worker in self.workers:
+            worker.join(1)
+        shutil.rmtree(self.manifestFolder, True)
+
+    # Class Function: Start (or restart) a worker with a fresh inbox
+    def _startWorker(self, workerId):
+        inbox = multiprocessing.Queue()
+        worker = multiprocessing.Process(target = _poolWorker,
+                                         name = 'PoolWorker' + str(workerId),
+                                         args = (workerId,
+                                                 inbox,
+                                                 self.statusPipe,
+                                                 self.channel,
+                                                 self.cancelFlags,
+                                                 self.searchPaths))
+        worker.daemon = True
+        worker.start()
+        self.workers[workerId] = worker
+        self.inboxes[workerId] = inbox
+
+        # Replay the specifications of the jobs still in progress
+        for job in self.jobs.values():
+            inbox.put(job['spec'])
+
+    # Class Function: Dispatcher thread that turns finished tasks into new ones
+    def _dispatchLoop(self):
+        retryWait = None
+        while True:
+            # Wake up for the next delayed retry and to check the workers even
+            # without status messages
+            if not self.statusPipe.wait(min(retryWait, workerCheckInterval)
+                                        if retryWait != None
+                                        else workerCheckInterval):
+                with self.lock:
+                    self._checkWorkers()
+                    self._dispatch()
+                    retryWait = self._retryWait()
+                continue
+            message = self.statusPipe.get()
+            if message == None:
+                break
+
+            messageType, workerId = message[0], message[1]
+            with self.lock:
+                # Worker claimed an output file for its current task
+                if messageType == 'output':
+                    self.workerOutputs[workerId].append(message[2])
+                    continue
+
+                # Worker found no batch function in a batch job's tool: send
+                # the job's tasks singly
+                if messageType == 'unbatched':
+                    if message[2] in self.jobs:
+                        self.jobs[message[2]]['batch'] = False
+                    continue
+
+                # Worker could not import a job's tool: fail the job (the
+                # worker stays idle or busy as it was)
+                if messageType == 'failed':
+                    self._failJob(message[2], message[3])
+                    self._dispatch()
+                    retryWait = self._retryWait()
+                    continue
+
+                # Worker finished a task or block of the job; batch jobs keep
+                # a smoothed time per item and its smoothed deviation to size
+                # their next blocks
+                if messageType == 'done' and workerId in self.busyWorkers:
+                    jobId = self.busyWorkers.pop(workerId)[0]
+                    self.workerOutputs.pop(workerId, None)
+                    if jobId in self.jobs:
+                        job = self.jobs[jobId]
+                        job['running'] -= 1
+                        itemSeconds = message[5] / max(1, message[4])
+                        if job['itemSeconds'] == None:
+                            job['itemSeconds'] = itemSeconds
+                        else:
+                            job['itemDeviation'] = \
+                                0.7 * job['itemDeviation'] + \
+                                0.3 * abs(itemSeconds - job['itemSeconds'])
+                            job['itemSeconds'] = 0.7 * job['itemSeconds'] + \
+                                                 0.3 * itemSeconds
+
+                        # Delay the retried tasks with exponential backoff
+                        for taskIndex in message[6]:
+                            attempt = job['attempts'].get(taskIndex, 0) + 1
+                            job['attempts'][taskIndex] = attempt
+                            delay = min(maxRetryDelay,
+                                        retryDelay * 2 ** (attempt - 1))
+                            heapq.heappush(job['delayed'],
+                                           (time.time() + delay, taskIndex))
+
+                # Worker was terminated: remove its partial outputs and
+                # replace it with a fresh worker
+                elif messageType == 'terminated':
+                    if workerId in self.busyWorkers:
+                        jobId = self.busyWorkers.pop(workerId)[0]
+                        if jobId in self.jobs:
+                            self.jobs[jobId]['running'] -= 1
+                    for outputPath in self.workerOutputs.pop(workerId, []):
+                        if os.path.isfile(outputPath):
+                            os.remove(outputPath)
+                    if workerId in self.idleWorkers:
+                        self.idleWorkers.remove(workerId)
+                    self.terminatingWorkers.discard(workerId)
+                    self._startWorker(workerId)
+
+                # Worker is idle again unless it is being replaced
+                if messageType != 'terminated' and \
+                   workerId not in self.terminatingWorkers:
+                    self.idleWorkers.append(workerId)
+                if time.time() - self.lastWorkerCheck >= workerCheckInterval:
+                    self._checkWorkers()
+                self._dispatch()
+                retryWait = self._retryWait()
+
+    # Class Function: Replace the workers that died outside terminateJob,
+    # failing the job of the task a worker died in (lock must be held)
+    # Only checked while the status pipe is empty, so every message a dead
+    # worker sent was handled before it is replaced
+    def _checkWorkers(self):
+        self.lastWorkerCheck = time.time()
+        deadWorkers = [workerId for workerId, worker in enumerate(self.workers)
+                       if workerId not in self.terminatingWorkers and
+                       not worker.is_alive()]
+        if not deadWorkers or not self.statusPipe.empty():
+            return
+        for workerId in deadWorkers:
+            if workerId in self.busyWorkers:
+                jobId = self.busyWorkers.pop(workerId)[0]
+                if jobId in self.jobs:
+                    self.jobs[jobId]['running'] -= 1
+                self._failJob(jobId, 'Worker ' + str(workerId) +
+                              ' exited with code ' +
+                              str(self.workers[workerId].exitcode))
+            for outputPath in self.workerOutputs.pop(workerId, []):
+                if os.path.isfile(outputPath):
+                    os.remove(outputPath)
+            if workerId in self.idleWorkers:
+                self.idleWorkers.remove(workerId)
+            self._startWorker(workerId)
+
+    # Class Function: Cancel a job (lock must be held)
+    def _cancelJob(self, jobId):
+        if jobId in self.jobs:
+            self.cancelFlags[jobId % cancelSlots] = 1
+            self.jobs[jobId]['pending'].clear()
+            del self.jobs[jobId]['delayed'][:]
+            self.jobs[jobId]['open'] = False
+            self.jobs[jobId]['held'] = False
+
+    # Class Function: Cancel a job and keep the error that failed it (the
+    # first one when several workers report it) (lock must be held)
+    def _failJob(self, jobId, error):
+        if jobId in self.jobs and not self.jobs[jobId]['failed']:
+            self.jobs[jobId]['failed'] = True
+            self.jobErrors[jobId] = error
+            self._cancelJob(jobId)
+
+    # Class Function: Seconds until the next delayed retry is due, None
+    # without delayed retries (lock must be held)
+    def _retryWait(self):
+        dueTimes = [job['delayed'][0][0] for job in self.jobs.values()
+                    if job['delayed']]
+        if not dueTimes:
+            return None
+        return max(0.0, min(dueTimes) - time.time())
+
+    # Class Function: Move a job's due retries ahead of its pending tasks
+    # (lock must be held)
+    def _releaseRetries(self, job, now):
+        while job['delayed'] and job['delayed'][0][0] <= now:
+            dueTime, taskIndex = heapq.heappop(job['delayed'])
+            job['pending'].pushFront(taskIndex, dueTime)
+
+    # Class Function: Check whether a task may still be retried (lock must be
+    # held)
+    def _retryable(self, job, taskIndex):
+        return job['attempts'].get(taskIndex, 0) < job['retries']
+
+    # Class Function: Items in a batch job's next block (lock must be held)
+    # Blocks hold as many items as fit in blockSeconds at the item's predicted
+    # cost (its smoothed time plus twice the smoothed deviation, so noisy
+    # items get single task blocks) but stay small enough that every worker
+    # still gets a share of the pending tasks; jobs without timings yet get
+    # single task blocks
+    def _blockSize(self, job):
+        if job['itemSeconds'] == None:
+            blockSize = 1
+        else:
+            itemCost = job['itemSeconds'] + 2 * job['itemDeviation']
+            blockSize = int(blockSeconds / max(itemCost, 1e-7))
+        workerShare = -(-len(job['pending']) // len(self.workers))
+        return max(1, min(blockSize, maxBlockSize, workerShare))
+
+    # Class Function: Hand pending tasks to idle workers (lock must be held)
+    # Each idle worker goes to the job running the fewest tasks for its
+    # weight, so the workers are shared in proportion to the weights and a
+    # finished job's workers move to the remaining jobs as they free up.
+    # Ties go to the job served least for its weight.
+    # Due retries go first within their job, so they are spread among the
+    # fresh tasks instead of waiting for the job's last tasks.
+    def _dispatch(self):
+        now = time.time()
+        for job in self.jobs.values():
+            self._releaseRetries(job, now)
+
+        while self.idleWorkers:
+            eligibleJobs = [job for job in self.jobs.values()
+                            if job['pending'] and not job['held'] and
+                            job['running'] < job['cpuLimit']]
+            if not eligibleJobs:
+                break
+            job = min(eligibleJobs, key = lambda x: (x['running'] / x['weight'],
+                                                     x['served'] / x['weight']))
+            job['running'] += 1
+            job['served'] += 1
+            workerId = self.idleWorkers.popleft()
+            jobId = job['spec'][1]
+
+            # Batch jobs get a block of tasks, other jobs a single task
+            if job['batch']:
+                block = [job['pending'].pop()
+                         for x in xrange(min(self._blockSize(job),
+                                             len(job['pending'])))]
+                self.busyWorkers[workerId] = (jobId, block[0][0])
+                self.inboxes[workerId].put(
+                    ('block', jobId, [x[0] for x in block], block[0][1],
+                     [x[0] for x in block if self._retryable(job, x[0])]))
+            else:
+                taskIndex, queued = job['pending'].pop()
+                self.busyWorkers[workerId] = (jobId, taskIndex)
+                self.inboxes[workerId].put(
+                    ('task', jobId, taskIndex, queued,
+                     self._retryable(job, taskIndex)))
+
+        # Retire finished jobs, mark their end in the result channel (behind
+        # every record their tasks sent, since workers flush before reporting
+        # a task done) and let workers release their job specification
+        for jobId, job in self.jobs.items():
+            if not job['pending'] and not job['delayed'] and \
+               job['running'] == 0 and not job['open'] and not job['held']:
+                del self.jobs[jobId]
+                self.channel.pipe.put([resultRecord.ResultRecord(
+                    jobId, 0, resultRecord.JOB_END).pack()])
+                for inbox in self.inboxes:
+                    inbox.put(('end', jobId))
+                job['manifest'].close()